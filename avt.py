@@ -6,39 +6,64 @@
 # Copyright 2017 Quanta Inc
 
 import argparse
+import bisect
 import openpyxl
 import csv
 import string
+import sys
 import getpass
 import re
 import copy
+import io
+import os
+import json
+import math
+import traceback
+import contextlib
+import itertools
+import posixpath
+import pickle
+import copyreg
+import gzip
+import hashlib
+import signal
+import socket
+import socketserver
+import sqlite3
+import struct
+import tempfile
+import time
+import tracemalloc
+import zipfile
+import zlib
+from collections import OrderedDict
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+try:
+    import resource # Peak RSS of the process, not available on Windows
+except ImportError:
+    resource = None
+try:
+    import zstandard # Only needed for .zst inputs
+except ImportError:
+    zstandard = None
+try:
+    import numpy # Only needed for --compare and --aggregate
+except ImportError:
+    numpy = None
 from datetime import date, datetime
 from openpyxl.worksheet import *
 from openpyxl.styles import Font, Border, Side, Color, PatternFill
 from openpyxl.utils import get_column_letter, column_index_from_string, coordinate_from_string
 from openpyxl.cell import Cell
-
-# Set up arguments for this program
-parser = argparse.ArgumentParser(description="Auto Verification program!", formatter_class=argparse.RawTextHelpFormatter)
-parser.add_argument("-r", "--reviser", default=string.capwords(getpass.getuser()), help="who release this verification document")
-parser.add_argument("-w", "--reviewer", default="Doris", help="the reviewer name, default name is Doris")
-parser.add_argument("-s", "--source", required=True, help="path of source .xlsx verification document")
-parser.add_argument("-l", "--csvlog", required=True, help="path of .csv file in CSVLOG folder")
-parser.add_argument("-m", "--modem", required=True, help="path of .txt file in MODEM folder")
-parser.add_argument("-c", "--csv", required=True, help="path of .csv file in CSV folder")
-parser.add_argument("-v", "--ver", required=True, help="version number of the new test plan")
-parser.add_argument("-d", "--date", required=True, help="overlay verified date, format: 20170509")
-
-# Combine all arguments into a list called args
-args = parser.parse_args()
-reviser_name = args.reviser
-reviewer_name = args.reviewer
-open_workbook = args.source # source Excel file path
-open_csvlog = args.csvlog # CSVLOG file path
-open_modem = args.modem # MODEM log file path
-open_csv = args.csv # CSV file path
-testplan_ver = args.ver
-ovl_verify_date = args.date
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.utils.bound_dictionary import BoundDictionary
+from openpyxl.worksheet.dimensions import DimensionHolder
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles.hashable import HashableObject
+from openpyxl.writer.excel import ExcelWriter
 
 # Cell background color options
 rgb_black = [0,0,0] # Black color
@@ -59,53 +84,271 @@ cyan_color_string = "".join([str(hex(i))[2:].upper().rjust(2, "0") for i in rgb_
 rgb_navy = [25,25,112] # Navy Blue
 navy_color_string = "".join([str(hex(i))[2:].upper().rjust(2, "0") for i in rgb_navy])
 
+rgb_red = [255,199,206] # Light Red
+red_color_string = "".join([str(hex(i))[2:].upper().rjust(2, "0") for i in rgb_red])
+
+rgb_yellow = [255,235,156] # Light Yellow
+yellow_color_string = "".join([str(hex(i))[2:].upper().rjust(2, "0") for i in rgb_yellow])
+
+# Excel row limit, modem log rows beyond it continue in 'UART Log Check (2)', 'UART Log Check (3)', ...
+excel_max_rows = 1048576
+uart_log_max_rows = excel_max_rows - 5 # Data starts at row 4, plus the bottom margin rows
+
+# Memory the lines of a modem file or the rows of a CSV file may take when they are read ahead of
+# their step, counted with sys.getsizeof() for every str and list plus a list slot for each, which
+# is several times the size of the file. Larger files are read again while their step runs.
+preload_max_bytes = 256 * 1024 * 1024
+
+# Compressed inputs are recognised by their magic bytes, whatever their file name. The byte scans
+# read inputs in chunks of input_chunk_bytes.
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+compressed_suffixes = ('.gz', '.zst')
+input_chunk_bytes = 1024 * 1024
+
+# Namespaces of the .xlsx package parts
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Columns of a batch manifest, 'reviser', 'reviewer' and 'output_dir' are optional
+manifest_required_fields = ['source', 'csvlog', 'modem', 'csv', 'ver', 'date']
+manifest_path_fields = ['source', 'csvlog', 'modem', 'csv', 'output_dir']
+
+# Shared registry of border/fill/font objects, one instance per distinct combination.
+# Cached objects are shared between cells, so never modify them after creation.
+class StyleCache(object):
+    def __init__(self):
+        self.styles = {}
+        self.created = 0
+        self.reused = 0
+
+    def get(self, key, factory):
+        style = self.styles.get(key)
+        if style is None:
+            style = self.styles[key] = factory()
+            self.created += 1
+        else:
+            self.reused += 1
+        return style
+
+    # Thin (or empty) border, with medium black sides on the selected edges
+    def border(self, thin_border=False, color=black_color_string, left=False, right=False, top=False, bottom=False):
+        if not thin_border:
+            color = None
+        def factory():
+            side = Side(border_style='medium', color=black_color_string) # Black color border by default
+            inner = [Side(style='thin', color=color) if thin_border else Side() for i in range(4)]
+            return Border(left=side if left else inner[0],
+                          right=side if right else inner[1],
+                          top=side if top else inner[2],
+                          bottom=side if bottom else inner[3])
+        return self.get(('border', thin_border, color, left, right, top, bottom), factory)
+
+    # Solid fill of select_color, or no fill at all if select_color is None
+    def fill(self, select_color=None):
+        def factory():
+            if select_color is None:
+                return PatternFill()
+            return PatternFill(fill_type="solid", start_color='FF' + select_color, end_color='FF' + select_color)
+        return self.get(('fill', select_color), factory)
+
+    def font(self, font_color="000000", font_type="Times New Roman", font_bold=False, font_italic=False, font_size=None):
+        def factory():
+            return Font(name=font_type, size=font_size, bold=font_bold, italic=font_italic, color=font_color)
+        return self.get(('font', font_color, font_type, font_bold, font_italic, font_size), factory)
+
+style_cache = StyleCache()
+
+# Wall time, CPU time, peak memory and counters (cells written, bytes read, ...) of every stage.
+# Does nothing unless enabled, since memory tracing slows the run down.
+class Profiler(object):
+    def __init__(self, enabled=False):
+        self.reset(enabled)
+
+    def reset(self, enabled=False):
+        self.enabled = enabled
+        self.stages = []
+        self.current = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        self.current = {'name': name}
+        styles_created = style_cache.created
+        tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            stage, self.current = self.current, None
+            stage['wall_time'] = round(time.perf_counter() - wall, 6)
+            stage['cpu_time'] = round(time.process_time() - cpu, 6)
+            stage['peak_memory'] = tracemalloc.get_traced_memory()[1] # bytes allocated by Python
+            if resource:
+                stage['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stage['styles_created'] = style_cache.created - styles_created
+            self.stages.append(stage)
+
+    def count(self, name, n=1):
+        if self.current is not None:
+            self.current[name] = self.current.get(name, 0) + n
+
+    # Count the size of a file that is read
+    def read(self, path):
+        if self.current is not None:
+            self.count('bytes_read', os.path.getsize(path))
+
+    def report(self, **fields):
+        totals = {}
+        for stage in self.stages:
+            for k, v in stage.items():
+                if k in ('wall_time', 'cpu_time', 'styles_created', 'cells_written', 'bytes_read'):
+                    totals[k] = round(totals.get(k, 0) + v, 6)
+                elif k in ('peak_memory', 'max_rss_kb'):
+                    totals[k] = max(totals.get(k, 0), v)
+        fields.update({'stages': self.stages, 'totals': totals})
+        return fields
+
+profiler = Profiler()
+
+# Row/column dimensions are defaultdict subclasses whose default factory and reference attribute
+# are lost by the default defaultdict pickling, so they are rebuilt explicitly. Only copyreg
+# functions are referenced, so pickles written by the script can be loaded with `import avt`.
+def reduce_bound_dictionary(d):
+    return copyreg.__newobj__, (type(d),), (d.__dict__, {'default_factory': d.default_factory}), None, iter(d.items())
+
+copyreg.pickle(BoundDictionary, reduce_bound_dictionary)
+copyreg.pickle(DimensionHolder, reduce_bound_dictionary)
+
+# Parsed template workbooks keyed by path and modification time. The parsed workbook is kept
+# pickled, so every job gets its own deep copy without parsing the .xlsx file again.
+# With patch=True only the sheets the steps edit are parsed (see read_patch_source).
+# At most max_templates are kept, the least recently used one is dropped first, and the entries
+# of a template that changed on disk are dropped when it is loaded again.
+class TemplateCache(object):
+    def __init__(self, max_templates=8):
+        self.max_templates = max_templates
+        self.templates = OrderedDict() # (path, patch) -> (mtime, pickled workbook), least recently used first
+
+    def load(self, path, patch=False):
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        for key in [k for k, (m, _) in self.templates.items() if k[0] == path and m != mtime]:
+            del self.templates[key]
+        cached = self.templates.get((path, patch))
+        if cached is not None:
+            self.templates.move_to_end((path, patch))
+            return pickle.loads(cached[1])
+        workbook = openpyxl.load_workbook(read_patch_source(path) if patch else path)
+        self.templates[(path, patch)] = (mtime, pickle.dumps(workbook, pickle.HIGHEST_PROTOCOL))
+        while len(self.templates) > self.max_templates:
+            self.templates.popitem(last=False)
+        return workbook
+
+template_cache = TemplateCache()
+
+# Incremental rebuilds: the output workbook of the last build of every template is kept in a
+# cache folder, with the inputs each step depended on. A rebuild starts from that workbook, puts
+# back the template's sheets of the steps whose inputs changed and redoes only those steps.
+# Step -> (input file, Step 0 fields) it depends on, and the sheets it writes
+step_dependencies = {
+    'step 1 version': (None, ['ovl_version_name', 'release_date', 'station_name', 'reviser_name',
+                              'ovl_verify_date', 'reviewer_name', 'serial_num']),
+    'step 2 program verification': (None, ['release_date', 'station_name', 'ovl_version_name', 'diags_version', 'total_test_time']),
+    'step 3 csv log comparison': ('csvlog', ['station_name', 'ovl_version_name', 'compare']),
+    'step 3b csv log units': ('units', ['station_name', 'ovl_version_name', 'aggregate']),
+    'step 4 uart log check': ('modem', ['station_name', 'ovl_version_name']),
+    'step 5 csv file': ('csv', []),
+}
+step_sheets = {
+    'step 1 version': ['Version '],
+    'step 2 program verification': ['Program Verification'],
+    'step 3 csv log comparison': ['CSV log comparison'],
+    'step 3b csv log units': ['CSV log units'], # Only in documents built with --aggregate
+    'step 4 uart log check': ['UART Log Check'], # Step 4 removes the continuation sheets itself
+    'step 5 csv file': ['CSV file'],
+}
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def step_key(step, digests, info):
+    input_name, fields = step_dependencies[step]
+    return (digests[input_name] if input_name else None, tuple(info[k] for k in fields))
+
+# Replace sheets of the workbook with the same sheets of its (unmodified) template. The cached
+# workbook was built from the same template, so style indices of the template sheets stay valid.
+def restore_template_sheets(workbook, template, titles):
+    for title in titles:
+        if title not in template.get_sheet_names() or title not in workbook.get_sheet_names():
+            continue # The step creates or removes this sheet itself, e.g. 'CSV log units'
+        sheet = template.get_sheet_by_name(title)
+        template.remove_sheet(sheet)
+        sheet._WorkbookChild__parent = workbook
+        workbook._sheets[workbook._sheets.index(workbook.get_sheet_by_name(title))] = sheet
+
+# Style objects keep their hash in _key, but string hashes differ between processes, so workbooks
+# pickled to disk are written without it
+class WorkbookPickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if isinstance(obj, HashableObject):
+            reduced = obj.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+            state = dict(reduced[2])
+            state.pop('_key', None)
+            return reduced[:2] + (state,) + reduced[3:]
+        return NotImplemented
+
+class BuildCache(object):
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path(self, template_digest):
+        return os.path.join(self.folder, template_digest + '.pickle')
+
+    def load(self, template_digest):
+        try:
+            with open(self.path(template_digest), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def store(self, template_digest, entry):
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(template_digest)
+        with open(path + '.tmp', 'wb') as f:
+            WorkbookPickler(f, pickle.HIGHEST_PROTOCOL).dump(entry)
+        os.replace(path + '.tmp', path) # Jobs of the same template may store at the same time
+
 def set_border(ws, cell_range, thin_border=True, color=black_color_string):
     rows = ws[cell_range]
-    side = Side(border_style='medium', color=black_color_string) # Black color border by default
 
     rows = list(rows)
     max_y = len(rows) - 1  # index of the last row
     for pos_y, cells in enumerate(rows):
         max_x = len(cells) - 1  # index of the last cell
         for pos_x, cell in enumerate(cells):
-            if thin_border:
-                border = Border(left=Side(style='thin', color=color),
-                                right=Side(style='thin', color=color),
-                                top=Side(style='thin', color=color),
-                                bottom=Side(style='thin', color=color))
-            else:
-                border = Border(left=Side(),
-                                right=Side(),
-                                top=Side(),
-                                bottom=Side())
-                
-            if pos_x == 0:
-                border.left = side
-            if pos_x == max_x:
-                border.right = side
-            if pos_y == 0:
-                border.top = side
-            if pos_y == max_y:
-                border.bottom = side
-
-            # Set thin border for each cell
-            cell.border = border
+            # Set thin border for each cell, and medium border for the edge cells
+            cell.border = style_cache.border(thin_border, color, pos_x == 0, pos_x == max_x, pos_y == 0, pos_y == max_y)
 
-            # set medium border for the edge cells
-            if pos_x == 0 or pos_x == max_x or pos_y == 0 or pos_y == max_y:
-                cell.border = border
-                
-def set_cells_color(cell_range, select_color):
-    for cIndex1, cells in enumerate(worksheet[cell_range]):
+def set_cells_color(ws, cell_range, select_color):
+    fill = style_cache.fill(select_color)
+    for cIndex1, cells in enumerate(ws[cell_range]):
         for cIndex2, cell in enumerate(cells):
-            cell.fill = PatternFill(fill_type="solid", start_color='FF' + select_color, end_color='FF' + select_color)
+            cell.fill = fill
 
-def set_font_style(cell_range, font_bold=True, font_italic=False, font_color="000000", font_type="Times New Roman"):
-    for cIndex1, cells in enumerate(worksheet[cell_range]):
+def set_font_style(ws, cell_range, font_bold=True, font_italic=False, font_color="000000", font_type="Times New Roman"):
+    font = style_cache.font(font_color, font_type, font_bold, font_italic)
+    for cIndex1, cells in enumerate(ws[cell_range]):
         for cIndex2, cell in enumerate(cells):
-            cell.font = Font(color = font_color)
-            cell.font = cell.font.copy(name=font_type, bold=font_bold, italic=font_italic)
-            
+            cell.font = font
+
 def is_number(s):
     try:
         float(s) # for int, long and float
@@ -116,26 +359,231 @@ def is_number(s):
             return False
     return True
 
-def clear_extra_cells(cell_range):
-    border = Border(left=Side(),right=Side(), top=Side(), bottom=Side())
-    for cIndex1, cells in enumerate(worksheet[cell_range]):
+# ASCII characters not in string.printable, non-ASCII characters are dropped when encoding
+unprintable_bytes = bytes([i for i in range(128) if chr(i) not in string.printable])
+
+# Remove illegal characters from a whole line at once, same as filtering each character by string.printable
+def sanitize_modem_line(line):
+    return line.encode('ascii', 'ignore').translate(None, unprintable_bytes).decode('ascii')
+
+# Split a modem log line into cleaned cell values
+def split_modem_line(line):
+    row = sanitize_modem_line(line).split('\t')
+    # Convert cell value that contains multiple "=" to plan text string
+    return [" " + value if "==" in value else value for value in row]
+
+def clear_extra_cells(ws, cell_range):
+    fill = style_cache.fill()
+    border = style_cache.border()
+    for cIndex1, cells in enumerate(ws[cell_range]):
         for cIndex2, cell in enumerate(cells):
-            cell.fill = PatternFill()
+            cell.fill = fill
             cell.border = border
 
-def set_column_width(start_cell_letter, end_cell_letter, column_width, larger_one):
+def set_column_width(ws, start_cell_letter, end_cell_letter, column_width, larger_one):
     start_index = column_index_from_string(start_cell_letter)
     end_index = column_index_from_string(end_cell_letter)
     numbers_of_col = (end_index - start_index) + 1
     if numbers_of_col < larger_one:
            column_width = int((column_width * larger_one) / numbers_of_col)
     for i in range(start_index, end_index + 1):
-        worksheet.column_dimensions[get_column_letter(i)].width = column_width
-    worksheet.column_dimensions[get_column_letter(end_index + 1)].width = 5
-
-def insert_rows(self, row_idx, cnt, above=False, copy_style=True, copy_merged_columns=True, fill_formulae=True):
-    CELL_RE = re.compile("(?P<col>\$?[A-Z]+)(?P<row>\$?\d+)")
-    row_idx = row_idx - 1 if above else row_idx
+        ws.column_dimensions[get_column_letter(i)].width = column_width
+    ws.column_dimensions[get_column_letter(end_index + 1)].width = 5
+
+# Empty background cells are not saved as styled cells: compact_background() removes the empty
+# cells that only carry the gray background fill and paints their area with one conditional
+# format per sheet instead, which looks the same in Excel. expand_background() turns that format
+# back into background coordinates before a step edits the sheet again (see BackgroundCells).
+def background_rule(select_color):
+    fill = PatternFill(fill_type="solid", start_color='FF' + select_color, end_color='FF' + select_color)
+    return FormulaRule(formula=['TRUE'], fill=fill)
+
+def is_background_rule(rule):
+    return (rule.type == 'expression' and list(rule.formula) == ['TRUE'] and rule.dxf is not None and rule.dxf.fill is not None
+            and rule.dxf.fill.fill_type == 'solid' and rule.dxf.font is None and rule.dxf.border is None)
+
+# Rectangles covering a set of (row, column) coordinates: runs of columns, merged over rows with the same runs
+def coordinate_ranges(coordinates):
+    by_row = {}
+    for r, c in coordinates:
+        by_row.setdefault(r, []).append(c)
+    runs_by_row = {}
+    for r, cols in by_row.items():
+        cols.sort()
+        runs = []
+        for c in cols:
+            if runs and runs[-1][1] == c - 1:
+                runs[-1][1] = c
+            else:
+                runs.append([c, c])
+        runs_by_row[r] = set(tuple(run) for run in runs)
+    ranges = []
+    open_runs = {} # (first column, last column) -> first row of the rectangle still growing
+    previous_row = None
+    for r in sorted(runs_by_row) + [None]:
+        runs = runs_by_row.get(r, set())
+        for run in list(open_runs):
+            if run not in runs or r != previous_row + 1:
+                ranges.append((open_runs.pop(run), run[0], previous_row, run[1]))
+        for run in runs:
+            open_runs.setdefault(run, r)
+        previous_row = r
+    return ["{}{}:{}{}".format(get_column_letter(c1), r1, get_column_letter(c2), r2) for r1, c1, r2, c2 in sorted(ranges)]
+
+# While a step edits a sheet, its cells are kept in a BackgroundCells dict. paint_background()
+# only records the empty coordinates it paints, openpyxl still sees them as cells (`in`, max_row,
+# max_column) and a Cell with the background fill is created the first time one of them is
+# accessed. The coordinates no step touched go straight into the conditional format, the padding
+# around the data never exists as Cell objects.
+class BackgroundCells(dict):
+    def __init__(self, ws, cells, select_color):
+        dict.__init__(self, cells)
+        self.ws = ws
+        self.select_color = select_color
+        self.background = set() # Painted coordinates without a Cell, never keys of the dict itself
+
+    def __missing__(self, key):
+        if key not in self.background:
+            raise KeyError(key)
+        self.background.discard(key)
+        cell = Cell(self.ws, row=key[0], col_idx=key[1])
+        cell.fill = style_cache.fill(self.select_color)
+        dict.__setitem__(self, key, cell)
+        return cell
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.background
+
+    def __iter__(self):
+        return itertools.chain(dict.__iter__(self), self.background)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.background)
+
+    def __setitem__(self, key, cell):
+        self.background.discard(key)
+        dict.__setitem__(self, key, cell)
+
+    def __delitem__(self, key):
+        if key in self.background:
+            self.background.discard(key)
+        else:
+            dict.__delitem__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key in self.background:
+            self[key]
+        return dict.pop(self, key, *default)
+
+def background_cells(ws, select_color=gray_color_string):
+    if not isinstance(ws._cells, BackgroundCells):
+        ws._cells = BackgroundCells(ws, ws._cells, select_color)
+    return ws._cells
+
+# Same as set_cells_color(), without creating the cells of the range that don't exist yet
+def paint_background(ws, cell_range, select_color=gray_color_string):
+    cells = background_cells(ws, select_color)
+    if cells.select_color != select_color:
+        set_cells_color(ws, cell_range, select_color)
+        return
+    fill = style_cache.fill(select_color)
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+    for r in range(min_row, max_row + 1):
+        for c in range(min_col, max_col + 1):
+            cell = dict.get(cells, (r, c))
+            if cell is None:
+                cells.background.add((r, c))
+            else:
+                cell.fill = fill
+
+def compact_background(ws, select_color=gray_color_string):
+    workbook = ws.parent
+    fill_id = workbook._fills.add(style_cache.fill(select_color))
+    border_id = workbook._borders.add(style_cache.border())
+    merged = ws.merged_cells
+    cells = ws._cells
+    empty = [(r, c) for (r, c), cell in cells.items()
+             if cell.value is None and cell._style is not None and cell._style.fillId == fill_id and cell._style.borderId == border_id
+             and cell.coordinate not in merged]
+    for coordinate in empty:
+        del cells[coordinate]
+    if isinstance(cells, BackgroundCells):
+        if cells.select_color == select_color:
+            empty += [(r, c) for r, c in cells.background if not merged or "{}{}".format(get_column_letter(c), r) not in merged]
+        ws._cells = dict(cells.items())
+    if not empty:
+        return
+    ws.conditional_formatting.add(" ".join(coordinate_ranges(empty)), background_rule(select_color))
+
+def expand_background(ws):
+    background_cells(ws)
+    cf_rules = ws.conditional_formatting.cf_rules
+    for range_string, rules in list(cf_rules.items()):
+        background = [rule for rule in rules if is_background_rule(rule)]
+        if not background:
+            continue
+        for cell_range in range_string.split():
+            paint_background(ws, cell_range, background[0].dxf.fill.start_color.rgb[2:])
+        rules = [rule for rule in rules if rule not in background]
+        if rules:
+            cf_rules[range_string] = rules
+        else:
+            del cf_rules[range_string]
+
+# Sparse index of the values of a worksheet: the rows holding a value in every column, built from
+# the cells that exist. Marker and last row searches use it instead of slicing ranges, which would
+# create a cell for every empty coordinate of the range. Rows are those of the values at the time
+# the index is built.
+class SheetIndex(object):
+    def __init__(self, ws):
+        self.cells = ws._cells
+        self.rows = {}
+        for (r, c), cell in ws._cells.items():
+            if cell.value is not None:
+                self.rows.setdefault(c, []).append(r)
+        for rows in self.rows.values():
+            rows.sort()
+
+    # Rows of column c holding a value, between first_row and last_row
+    def column_rows(self, c, first_row=1, last_row=None):
+        rows = self.rows.get(c, [])
+        return rows[bisect.bisect_left(rows, first_row):bisect.bisect_right(rows, last_row) if last_row else len(rows)]
+
+    # Last row holding a value in columns first_col..last_col, or None if they are empty
+    def last_row(self, first_col, last_col, first_row=1, last_row=None):
+        last = [rows[-1] for rows in (self.column_rows(c, first_row, last_row) for c in range(first_col, last_col + 1)) if rows]
+        return max(last) if last else None
+
+    # (row, column) of the values in columns first_col..last_col for which match(value) is true,
+    # in the order a range is read
+    def find(self, first_col, last_col, match, first_row=1, last_row=None):
+        return sorted((r, c) for c in range(first_col, last_col + 1) for r in self.column_rows(c, first_row, last_row)
+                      if match(self.cells[(r, c)].value))
+
+# Move the values (and styles, if move_styles=True) of a rectangular block by rows/cols in one pass,
+# cells are visited from the far end so overlapping source and target blocks are safe
+def move_range(ws, cell_range, rows=0, cols=0, move_styles=False):
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+    row_order = range(max_row, min_row - 1, -1) if rows > 0 else range(min_row, max_row + 1)
+    col_order = range(max_col, min_col - 1, -1) if cols > 0 else range(min_col, max_col + 1)
+    for row in row_order:
+        for col in col_order:
+            source = ws.cell(row = row, column = col)
+            target = ws.cell(row = row + rows, column = col + cols)
+            target.value = source.value
+            profiler.count('cells_written')
+            source.value = None
+            if move_styles:
+                target._style = source._style
+                source._style = None
+
+CELL_RE = re.compile("(?P<col>\$?[A-Z]+)(?P<row>\$?\d+)")
+
+# Shift cell references below row_idx down by cnt rows, all texts are rewritten in one regex pass
+def shift_references(texts, row_idx, cnt):
     def replace(m):
         row = m.group('row')
         prefix = "$" if row.find("$") != -1 else ""
@@ -143,76 +591,83 @@ def insert_rows(self, row_idx, cnt, above=False, copy_style=True, copy_merged_co
         row += cnt if row > row_idx else 0
         return m.group('col') + prefix + str(row)
 
-    # First, we shift all cells down cnt rows...
-    old_cells = set()
-    old_fas = set()
-    new_cells = dict()
-    new_fas = dict()
-    for c in self._cells.values():
-
-        old_coor = c.coordinate
-
-        # Shift all references to anything below row_idx
-        if c.data_type == Cell.TYPE_FORMULA:
-            c.value = CELL_RE.sub(
-                replace,
-                c.value
-            )
-            # Here, we need to properly update the formula references to reflect new row indices
-            if old_coor in self.formula_attributes and 'ref' in self.formula_attributes[old_coor]:
-                self.formula_attributes[old_coor]['ref'] = CELL_RE.sub(
-                    replace,
-                    self.formula_attributes[old_coor]['ref']
-                )
-
-        # Do the magic to set up our actual shift
-        if c.row > row_idx:
-            old_coor = c.coordinate
-            old_cells.add((c.row, c.col_idx))
-            c.row += cnt
-            new_cells[(c.row, c.col_idx)] = c
-            if old_coor in self.formula_attributes:
-                old_fas.add(old_coor)
-                fa = self.formula_attributes[old_coor].copy()
-                new_fas[c.coordinate] = fa
-
-    for coor in old_cells:
-        del self._cells[coor]
-    self._cells.update(new_cells)
-
-    for fa in old_fas:
-        del self.formula_attributes[fa]
-    self.formula_attributes.update(new_fas)
-
-    # Next, we need to shift all the Row Dimensions below our new rows down by cnt...
-    # CHANGED: for row in range(len(self.row_dimensions) - 1 + cnt, row_idx + cnt, -1):
-    for row in range(list(self.row_dimensions)[-1] + cnt, row_idx + cnt, -1):
-        new_rd = copy.copy(self.row_dimensions[row - cnt])
-        new_rd.index = row
-        self.row_dimensions[row] = new_rd
-        del self.row_dimensions[row - cnt]
+    if not texts:
+        return []
+    return CELL_RE.sub(replace, "\0".join(texts)).split("\0")
 
-    # Now, create our new rows, with all the pretty cells
-    # CHANGED: row_idx += 1
+# Insert cnt rows after row_idx (or before it if above=True), new rows copy style, formulas and
+# merged columns from the neighbouring rows
+def insert_rows(ws, row_idx, cnt, above=False, copy_style=True, copy_merged_columns=True, fill_formulae=True):
+    row_idx = row_idx - 1 if above else row_idx
     new_row_idx = row_idx + 1
+
+    # Index cells by row and collect all formulas, so we only walk the cells once
+    rows_index = {}
+    formula_cells = []
+    max_column = 1
+    for (r, c), cell in ws._cells.items():
+        rows_index.setdefault(r, []).append(cell)
+        if c > max_column:
+            max_column = c
+        if cell.data_type == Cell.TYPE_FORMULA:
+            formula_cells.append(cell)
+
+    # Shift all references to anything below row_idx
+    for cell, value in zip(formula_cells, shift_references([cell.value for cell in formula_cells], row_idx, cnt)):
+        cell.value = value
+    ref_coors = [coor for coor, fa in ws.formula_attributes.items() if 'ref' in fa]
+    for coor, ref in zip(ref_coors, shift_references([ws.formula_attributes[coor]['ref'] for coor in ref_coors], row_idx, cnt)):
+        ws.formula_attributes[coor]['ref'] = ref
+
+    # Shift the cells below row_idx down cnt rows, starting from the bottom row
+    for r in sorted([r for r in rows_index if r > row_idx], reverse=True):
+        for cell in rows_index[r]:
+            del ws._cells[(r, cell.col_idx)]
+            cell.row = r + cnt
+            ws._cells[(cell.row, cell.col_idx)] = cell
+    max_row = max(rows_index) if rows_index else 1
+    if max_row > row_idx:
+        max_row += cnt
+
+    moved_fas = {}
+    for coor in list(ws.formula_attributes):
+        col, row = coordinate_from_string(coor)
+        if row > row_idx:
+            moved_fas['%s%d' % (col, row + cnt)] = ws.formula_attributes.pop(coor)
+    ws.formula_attributes.update(moved_fas)
+
+    # Shift the Row Dimensions below our new rows down by cnt, then create the new ones from the row above
+    for row in sorted([r for r in ws.row_dimensions if r > row_idx], reverse=True):
+        rd = ws.row_dimensions.pop(row)
+        rd.index = row + cnt
+        ws.row_dimensions[row + cnt] = rd
     for row in range(new_row_idx, new_row_idx + cnt):
-        # Create a Row Dimension for our new row
-        new_rd = copy.copy(self.row_dimensions[row-1])
+        new_rd = copy.copy(ws.row_dimensions[row_idx])
         new_rd.index = row
-        self.row_dimensions[row] = new_rd
-
-        # Set row height of the new row
-        rowHeights = [self.row_dimensions[i+1].height for i in range(self.max_row)]
-        rowHeights = [15 if rh is None else rh for rh in rowHeights]
-        self.row_dimensions[row].height = max(rowHeights)
-
-        # CHANGED: for col in range(1,self.max_column):
-        for col in range(self.max_column):
-            # CHANGED: col = get_column_letter(col)
-            col = get_column_letter(col+1)
-            cell = self['%s%d' % (col, row)]
+        ws.row_dimensions[row] = new_rd
+
+    # Set row height of the new rows to the highest row of the sheet
+    rowHeights = [rd.height for r, rd in ws.row_dimensions.items() if 0 < r <= max_row and rd.height is not None]
+    if len(rowHeights) < max_row:
+        rowHeights.append(15)
+    for row in range(new_row_idx, new_row_idx + cnt):
+        ws.row_dimensions[row].height = max(rowHeights)
+
+    # Now, create our new rows, with all the pretty cells of the first row below them, relative
+    # references to that row point at the new row itself
+    source_row = new_row_idx + cnt
+    def own_row(m):
+        if m.group('row') != str(source_row):
+            return m.group(0)
+        return m.group('col') + str(row)
+
+    for row in range(new_row_idx, new_row_idx + cnt):
+        for col in range(1, max_column + 1):
+            cell = ws.cell(row = row, column = col)
             cell.value = None
-            source = self['%s%d' % (col, row+1)]
+            source = ws._cells.get((source_row, col))
+            if source is None:
+                continue
             if copy_style:
                 cell.number_format = source.number_format
                 cell.font = source.font.copy()
@@ -221,469 +676,2231 @@ def insert_rows(self, row_idx, cnt, above=False, copy_style=True, copy_merged_co
                 cell.fill = source.fill.copy()
             if fill_formulae and source.data_type == Cell.TYPE_FORMULA:
                 s_coor = source.coordinate
-                if s_coor in self.formula_attributes and 'ref' not in self.formula_attributes[s_coor]:
-                    fa = self.formula_attributes[s_coor].copy()
-                    self.formula_attributes[cell.coordinate] = fa
-                #print("Copying formula from cell %s%d to %s%d"%(col,row-1,col,row))
-                cell.value = re.sub(
-                    "(\$?[A-Z]{1,3}\$?)%d" % (row-1),
-                    lambda m: m.group(1) + str(row),
-                    source.value
-                )
+                if s_coor in ws.formula_attributes and 'ref' not in ws.formula_attributes[s_coor]:
+                    fa = ws.formula_attributes[s_coor].copy()
+                    ws.formula_attributes[cell.coordinate] = fa
+                cell.value = CELL_RE.sub(own_row, source.value)
                 cell.data_type = Cell.TYPE_FORMULA
 
     # Check for Merged Cell Ranges that need to be expanded to contain new cells
-    for cr_idx, cr in enumerate(self.merged_cell_ranges):
-        self.merged_cell_ranges[cr_idx] = CELL_RE.sub(
-            replace,
-            cr
-        )
+    ws.merged_cell_ranges[:] = shift_references(ws.merged_cell_ranges, row_idx, cnt)
 
     # Merge columns of the new rows in the same way row above does
     if copy_merged_columns:
-        for cr in self.merged_cell_ranges:
+        for cr in list(ws.merged_cell_ranges):
             min_col, min_row, max_col, max_row = range_boundaries(cr)
             if max_row == min_row == row_idx:
                 for row in range(new_row_idx, new_row_idx + cnt):
                     newCellRange = get_column_letter(min_col) + str(row) + ":" + get_column_letter(max_col) + str(row)
-                    self.merge_cells(newCellRange)
-                    
-Worksheet.insert_rows = insert_rows
-
-
-# Load the source .xlsx template file
-workbook = openpyxl.load_workbook(open_workbook)
-
-print("\nOpening source workbook '{}'\n".format(open_workbook.split('/')[-1]))
-
+                    ws.merge_cells(newCellRange)
+
+
+# 'gzip', 'zstd' or None for an uncompressed input file
+def input_compression(path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+# Binary stream of an input file, .gz and .zst files are decompressed while they are read
+def open_input_binary(path):
+    compression = input_compression(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("'{}' is zstd compressed, install the zstandard package to read it".format(path))
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+# Text stream of an input file, takes the arguments of open()
+def open_input(path, encoding=None, newline=None):
+    if input_compression(path) is None:
+        return open(path, encoding=encoding, newline=newline)
+    return io.TextIOWrapper(open_input_binary(path), encoding=encoding, newline=newline)
+
+# Byte chunks of an input file
+def iter_input_chunks(path):
+    with open_input_binary(path) as f:
+        for chunk in iter(lambda: f.read(input_chunk_bytes), b''):
+            yield chunk
+
+# Line count and widest line (tab count + 1) of a modem log, scanned chunk by chunk as bytes, so
+# no line is decoded. '\r\n', '\r' and '\n' end a line, same as reading the file in text mode.
+def scan_modem_log(path):
+    line_count = 0
+    max_tabs = -1
+    tail = b''
+    for chunk in iter_input_chunks(path):
+        chunk = tail + chunk
+        # A '\r' at the end of the chunk may be the first half of a '\r\n'
+        carry = b'\r' if chunk.endswith(b'\r') else b''
+        lines = chunk[:len(chunk) - len(carry)].replace(b'\r\n', b'\n').replace(b'\r', b'\n').split(b'\n')
+        tail = lines.pop() + carry
+        if lines:
+            line_count += len(lines)
+            max_tabs = max(max_tabs, max(map(bytes.count, lines, itertools.repeat(b'\t'))))
+    if tail:
+        lines = tail.replace(b'\r', b'\n').split(b'\n')
+        if not lines[-1]:
+            lines.pop()
+        line_count += len(lines)
+        max_tabs = max(max_tabs, max(line.count(b'\t') for line in lines))
+    return line_count, max_tabs + 1
+
+# Convert a CSVLOG field to int/float if it is a number, NaN, infinities and complex numbers stay text
+def convert_csvlog_value(col):
+    try:
+        return int(col)
+    except ValueError:
+        pass
+    try:
+        value = float(col)
+    except ValueError:
+        return col
+    return value if math.isfinite(value) else col
+
+# What float() accepts: signed digits with optional '_' separators, fraction and exponent, or inf/nan
+CSVLOG_DIGITS = r'\d(?:_?\d)*'
+CSVLOG_INT_RE = re.compile(r'\s*[+-]?{0}\s*$'.format(CSVLOG_DIGITS))
+CSVLOG_FLOAT_RE = re.compile(r'\s*[+-]?(?:(?:{0}\.?(?:{0})?|\.{0})(?:[eE][+-]?{0})?|inf(?:inity)?|nan)\s*$'.format(CSVLOG_DIGITS), re.IGNORECASE)
+
+# Type a whole CSVLOG column at once, same result as convert_csvlog_value on every field
+# but without raising and catching exceptions for text fields
+def convert_csvlog_column(column):
+    ints = list(map(CSVLOG_INT_RE.match, column))
+    if all(ints):
+        return list(map(int, column))
+    floats = list(map(CSVLOG_FLOAT_RE.match, column))
+
+    typed = []
+    for col, is_int, is_float in zip(column, ints, floats):
+        if is_int:
+            typed.append(int(col))
+        elif is_float and math.isfinite(float(col)):
+            typed.append(float(col))
+        else:
+            typed.append(col)
+    return typed
 
 # 0. Fetch some of the required data
-
-with open(open_csvlog, newline='', encoding='utf_8') as f:
-    reader = csv.reader(f)
-    for r, row in enumerate(reader):
-        for c, col in enumerate(row):
-            if r is 0 and c is 0: # Get station name
-                station_name = col
-            #elif r is 0 and c is 1: # Get hashtag
-                #unsplit_ovl_name = col.strip('SW_Version:').split('_')
-                #ovl_version_name = ["{}_{}_{}".format(unsplit_ovl_name[unsplit_ovl_name.index(i) - 1],
-                                                      #unsplit_ovl_name[unsplit_ovl_name.index(i)],
-                                                      #unsplit_ovl_name[unsplit_ovl_name.index(i) + 1])
-                                    #for i in unsplit_ovl_name if 'JH' in i].pop()
-                #csvlog_date_str = ovl_version_name[ovl_version_name.index('ver')-8:ovl_version_name.index('ver')]
-                #unsplit_ovl_name = col.split(':')
-                #hashtag = unsplit_ovl_name[1].strip('V')[:7]
-            elif r is 0 and c is 2:
-                serial_num = col.strip('Serial Number:')
-            elif col == "DIAGS_VERSION":
-                diags_version = row[c + 3] # Get the DIAGS_VERSION value
-            elif "total test time" in col.lower():
-                total_test_time = row[c + 1] # Get the total test time value
+# Parse the CSVLOG file once, Step 0 takes the header fields and Step 3 the typed rows.
+# Values are typed column by column, rows shorter than the widest row are padded with '' in columns.
+class CsvLog(object):
+    def __init__(self, path):
+        self.path = path
+        self.station_name = None
+        self.serial_num = None
+        self.diags_version = None
+        self.total_test_time = None
+        raw_rows = []
+
+        profiler.read(path)
+        with open_input(path, newline='', encoding='utf_8') as f:
+            reader = csv.reader(f)
+            for r, row in enumerate(reader):
+                for c, col in enumerate(row):
+                    if r == 0 and c == 0: # Get station name
+                        self.station_name = col
+                    #elif r is 0 and c is 1: # Get hashtag
+                        #unsplit_ovl_name = col.strip('SW_Version:').split('_')
+                        #ovl_version_name = ["{}_{}_{}".format(unsplit_ovl_name[unsplit_ovl_name.index(i) - 1],
+                                                              #unsplit_ovl_name[unsplit_ovl_name.index(i)],
+                                                              #unsplit_ovl_name[unsplit_ovl_name.index(i) + 1])
+                                            #for i in unsplit_ovl_name if 'JH' in i].pop()
+                        #csvlog_date_str = ovl_version_name[ovl_version_name.index('ver')-8:ovl_version_name.index('ver')]
+                        #unsplit_ovl_name = col.split(':')
+                        #hashtag = unsplit_ovl_name[1].strip('V')[:7]
+                    elif r == 0 and c == 2:
+                        self.serial_num = col.strip('Serial Number:')
+                    elif col == "DIAGS_VERSION":
+                        self.diags_version = row[c + 3] # Get the DIAGS_VERSION value
+                    elif "total test time" in col.lower():
+                        self.total_test_time = row[c + 1] # Get the total test time value
+                raw_rows.append(row)
+
+        widths = [len(row) for row in raw_rows]
+        max_width = max(widths) if widths else 0
+        self.columns = [convert_csvlog_column([row[c] if c < len(row) else '' for row in raw_rows]) for c in range(max_width)]
+        self.rows = [row[:width] for row, width in zip(zip(*self.columns), widths)] if self.columns else [[] for row in raw_rows]
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    # Header fields used by Steps 1 and 2
+    def info(self):
+        return {'station_name': self.station_name,
+                'serial_num': self.serial_num,
+                'diags_version': self.diags_version,
+                'total_test_time': self.total_test_time}
 
 # Create new version name for verification document
-worksheet = workbook.get_sheet_by_name('CSV log comparison')
-version_name_comp = worksheet['D2'].value.split(':')[1].strip(' ').split('_')
-qtm_version_num = str(int(version_name_comp[2]) + 1).zfill(3) # or use '%0*d' % (3, 10)
-new_version_name = version_name_comp[0].replace(version_name_comp[0][version_name_comp[0].index('ver')-8:version_name_comp[0].index('ver')], ovl_verify_date).replace(version_name_comp[0][version_name_comp[0].index('ver')+3:], testplan_ver)
-ovl_version_name = new_version_name + '_' + version_name_comp[1] + '_' + qtm_version_num
-
-# Get date of today in a particular format
-release_date = datetime.strftime(date.today(), "%Y/%m/%d")
-print('---------------------------------------')
-print('Station Name:', station_name)
-print('Version Name:', ovl_version_name)
-print('Verify Date:', datetime.strptime(ovl_verify_date, '%Y%m%d').strftime('%Y/%m/%d'))
-print('Test Sample SN:', serial_num)
-print('Reviser:', reviser_name)
-print('Reviewer:', reviewer_name)
-print('Release Date', release_date)
-print('---------------------------------------\n')
+def create_version_name(workbook, testplan_ver, ovl_verify_date):
+    worksheet = workbook.get_sheet_by_name('CSV log comparison')
+    return next_version_name(worksheet['D2'].value.split(':')[1].strip(' '), testplan_ver, ovl_verify_date)
+
+# Version name that follows a previous one, e.g. 'JH20170401ver11_TPA_004' -> 'JH20170509ver12_TPA_005'
+def next_version_name(version_name, testplan_ver, ovl_verify_date):
+    version_name_comp = version_name.split('_')
+    qtm_version_num = str(int(version_name_comp[2]) + 1).zfill(3) # or use '%0*d' % (3, 10)
+    new_version_name = version_name_comp[0].replace(version_name_comp[0][version_name_comp[0].index('ver')-8:version_name_comp[0].index('ver')], ovl_verify_date).replace(version_name_comp[0][version_name_comp[0].index('ver')+3:], testplan_ver)
+    return new_version_name + '_' + version_name_comp[1] + '_' + qtm_version_num
+
+# Components of a version name, ('JH', '20170401', '11', 'TPA', 4) for 'JH20170401ver11_TPA_004'
+def split_version_name(version_name):
+    version_name_comp = version_name.split('_')
+    ver = version_name_comp[0].index('ver')
+    return (version_name_comp[0][:ver-8], version_name_comp[0][ver-8:ver], version_name_comp[0][ver+3:],
+            version_name_comp[1], int(version_name_comp[2]))
 
 # 1. Creating data in 'Version' worksheet
-worksheet = workbook.get_sheet_by_name('Version ')
-            
-print("[Step 1] Creating data in 'Version' worksheet...\n")
+def create_version_sheet(workbook, info):
+    worksheet = workbook.get_sheet_by_name('Version ')
 
-worksheet['B3'] = ovl_version_name # Version
-worksheet['C5'] = ovl_version_name # Overlay Version
-worksheet['C3'] = release_date # Release Date (date of today by default)
-worksheet['D3'] = station_name # Station Name
-worksheet['E3'] = reviser_name # Reviser
-worksheet['C6'] = datetime.strptime(ovl_verify_date, '%Y%m%d').strftime('%Y/%m/%d') # Verify Date
-worksheet['C8'] = reviewer_name # Reviewer ('Doris' by default)
-worksheet['C9'] = serial_num # Test Sample SN
+    print("[Step 1] Creating data in 'Version' worksheet...\n")
 
-# Apply border to selected range of cells
-set_border(worksheet, "B2:E3")
-set_border(worksheet, "B5:E9")
-set_border(worksheet, "B11:D15")
+    worksheet['B3'] = info['ovl_version_name'] # Version
+    worksheet['C5'] = info['ovl_version_name'] # Overlay Version
+    worksheet['C3'] = info['release_date'] # Release Date (date of today by default)
+    worksheet['D3'] = info['station_name'] # Station Name
+    worksheet['E3'] = info['reviser_name'] # Reviser
+    worksheet['C6'] = datetime.strptime(info['ovl_verify_date'], '%Y%m%d').strftime('%Y/%m/%d') # Verify Date
+    worksheet['C8'] = info['reviewer_name'] # Reviewer ('Doris' by default)
+    worksheet['C9'] = info['serial_num'] # Test Sample SN
+    profiler.count('cells_written', 8)
 
-print("Complete creating data in 'Version' worksheet\n")
+    # Apply border to selected range of cells
+    set_border(worksheet, "B2:E3")
+    set_border(worksheet, "B5:E9")
+    set_border(worksheet, "B11:D15")
+
+    print("Complete creating data in 'Version' worksheet\n")
 
 
 # 2.Creating data in 'Program Verification' sheet
-print("[Step 2] Creating data in 'Program Verification' worksheet...\n")
+def create_program_verification_sheet(workbook, info):
+    print("[Step 2] Creating data in 'Program Verification' worksheet...\n")
 
-worksheet = workbook.get_sheet_by_name('Program Verification')
-worksheet.insert_rows(3, 1, above=True, copy_style=True, copy_merged_columns=True, fill_formulae=True)
-# Fill data into each cell
-worksheet['B3'] = release_date # Date
-worksheet['C3'] = station_name # Test station
-worksheet['F3'] = "N/A" # Fail symptom
-worksheet['G3'] = "Version:\n{}\nDiag Ver: {}".format(ovl_version_name, diags_version) # Program Version 
-worksheet['I3'] = float(total_test_time) # Test time
+    worksheet = workbook.get_sheet_by_name('Program Verification')
+    insert_rows(worksheet, 3, 1, above=True, copy_style=True, copy_merged_columns=True, fill_formulae=True)
+    # Fill data into each cell
+    worksheet['B3'] = info['release_date'] # Date
+    worksheet['C3'] = info['station_name'] # Test station
+    worksheet['F3'] = "N/A" # Fail symptom
+    worksheet['G3'] = "Version:\n{}\nDiag Ver: {}".format(info['ovl_version_name'], info['diags_version']) # Program Version
+    worksheet['I3'] = float(info['total_test_time']) # Test time
+    profiler.count('cells_written', 5)
 
-print("Complete creating data in 'Program Verification' worksheet\n")
+    print("Complete creating data in 'Program Verification' worksheet\n")
 
 
 # 3.Creating data in 'CSV log comparison' sheet
-print("[Step 3] Creating data in 'CSV log comparison' worksheet...\n")
-
-worksheet = workbook.get_sheet_by_name('CSV log comparison')
-
-csvfile = open_csvlog
-
-print("Reading csvlog data from {}...\n".format(open_csvlog.split('/')[-1]))
-
-# Clear data in right-hand side cell section
-cell_range = 'K{}:P{}'.format(worksheet.min_row, worksheet.max_row)
-rows = worksheet[cell_range]
-rows = list(rows)
-border = Border(
-    left=Side(),
-    right=Side(),
-    top=Side(),
-    bottom=Side()
-)
-lastCol = 5 # Use the default value, if right-side cell section is blank
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        if "total test time" in str(cell.value).lower():
-            lastCol = pos1 + 1
-            # Deleting data of cell range
-            for row in worksheet['K4:P{}'.format(lastCol)]:
-                for cell in row:
-                    cell.value = None
-                    cell.border = border
-                    
-# Set gray color for right-hand cell section
-#set_cells_color("K4:P{}".format(lastCol), gray_color_string)
-
-# Get total row counts of source CSVLOG file
-with open(csvfile, newline='', encoding='utf_8') as f:
-    reader = csv.reader(f)
-    row_count = len(list(reader))
-    
-# Set gray color to background section
-margin_bottom_rows = 2 # Can customize the margin bottom row value
-cell_range = "A16:Q{}".format(max(lastCol, row_count + 3) + margin_bottom_rows)
-set_cells_color(cell_range, gray_color_string)
-
-# Copy left CSVLOG to right-hand side cell sections
-cell_range = 'D{}:I{}'.format(worksheet.min_row, worksheet.max_row)
-rows = worksheet[cell_range]
-rows = list(rows)
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        if "total test time" in str(cell.value).lower():
-            lastCol = pos1 + 1
-
-# Save values from cell range A to a list
-cell_range = 'D4:I{}'.format(lastCol)
-rows = worksheet[cell_range]
-rows = list(rows)
-translated = []
-border = Border(left=Side(),
-                right=Side(),
-                top=Side(),
-                bottom=Side()
-                )
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        translated.append(cell.value)
-        # Clear data and border setting in left-hand side cells
-        cell.value = None
-        cell.border = border
-
-# Set gray color for left-hand cell section
-set_cells_color(cell_range, gray_color_string)
-
-# Paste values from list to cell range B
-cell_range = 'K4:P{}'.format(lastCol)
-rows = worksheet[cell_range]
-rows = list(rows)
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        cell.value = translated.pop(0)
-        # Fill white color background to each cell
-        cell.fill = PatternFill(fill_type="solid", start_color='FF' + white_color_string, end_color='FF' + white_color_string)
-
-# Copy header value from ws['D2'] to ws['K2']
-worksheet['K2'].value = worksheet['D2'].value
-
-# Apply border style to right-hand cell section
-set_border(worksheet, "K2:P2")
-set_border(worksheet, "K3:P3")
-set_border(worksheet, "K4:P{}".format(lastCol - 1), True, lightgray_color_string)
-set_border(worksheet, "K{}:P{}".format(lastCol, lastCol), False, lightgray_color_string)
-set_cells_color("K{}:P{}".format(lastCol, lastCol), cyan_color_string)
-
-# Copy data from source CSVLOG file to left-hand cell section
-with open(csvfile, newline='', encoding='utf_8') as f:
-    reader = csv.reader(f)
-    for r, row in enumerate(reader):
-        for c, col in enumerate(row):
-            this_cell = worksheet.cell(row = r+4, column = c+4)
-            if col != 'nan' and is_number(col): # Check if data is number
-                if '.' in col: # Convert string to float, if data is float number
-                    this_cell.value = float(col)
-                else:
-                    this_cell.value = int(col)
-            else:
-                this_cell.value = col
-            # Set all cells in left-side section to have same font type
-            this_cell.font = Font(color = "000000")
-            this_cell.font = this_cell.font.copy(name='Times New Roman', bold=False, italic=False)
-
-# Apply white background color and set border to left-hand cell section
-set_cells_color("D4:I{}".format(3 + row_count - 1), white_color_string)
-set_border(worksheet, "D4:I{}".format(3 + row_count - 1), True, lightgray_color_string)
-
-# Apply blue background color and border to left-hand bottom cells (Total Test Time)
-set_border(worksheet, "D{}:I{}".format(3 + row_count, 3 + row_count), False, lightgray_color_string)
-set_cells_color("D{}:I{}".format(3 + row_count, 3 + row_count), cyan_color_string)
-set_font_style("D{}:I{}".format(3 + row_count, 3 + row_count))
-
-# Set data and border for 2 header cells in left-hand cell section
-stationVersion= '{} VERSION: {}'.format(station_name, ovl_version_name)
-worksheet['D2'] = stationVersion
-worksheet['D3'] = 'CSV LOG'
-set_border(worksheet, "D2:I2")
-set_border(worksheet, "D3:I3")
-
-# If max_row (gray background section) larger then data cell section, delete extra gray rows
-if worksheet.max_row > max(lastCol, row_count + 3) + 1:
-    extraCellstartIndex = max(lastCol, row_count + 3) + 2
-    extraCellEndIndex = worksheet.max_row
-    grayCellMargin = worksheet.max_column
-    clear_extra_cells("A{}:{}{}".format(extraCellstartIndex, get_column_letter(grayCellMargin), extraCellEndIndex))
-       
-print("Complete creating data in 'CSV log comparison' worksheet\n")
+def create_csvlog_comparison_sheet(workbook, info, csvlog):
+    print("[Step 3] Creating data in 'CSV log comparison' worksheet...\n")
+
+    worksheet = workbook.get_sheet_by_name('CSV log comparison')
+    expand_background(worksheet)
+
+    print("Reading csvlog data from {}...\n".format(csvlog.path.split('/')[-1]))
+
+    # Clear data in right-hand side cell section
+    index = SheetIndex(worksheet)
+    is_total_test_time = lambda value: "total test time" in str(value).lower()
+    border = style_cache.border()
+    lastCol = 5 # Use the default value, if right-side cell section is blank
+    for row, col in index.find(11, 16, is_total_test_time, worksheet.min_row):
+        lastCol = row - worksheet.min_row + 1
+        # Deleting data of cell range
+        for cells in worksheet['K4:P{}'.format(lastCol)]:
+            for cell in cells:
+                cell.value = None
+                cell.border = border
 
+    # Set gray color for right-hand cell section
+    #set_cells_color(worksheet, "K4:P{}".format(lastCol), gray_color_string)
 
-# 4. Creating data in 'UART Log Check' sheet
-print("[Step 4] Creating data in 'UART Log Check' worksheet...\n")
-
-worksheet = workbook.get_sheet_by_name('UART Log Check')
-
-# Clear the data in right-side cell section
-search_range = "A3:{}3".format(get_column_letter(worksheet.max_column - 1))
-rows = worksheet[search_range]
-rows = list(rows)
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        if str(cell.value).lower() == "uart log":
-            right_cell_start_index = pos2 + 1
-
-rightSectionStartIndex = get_column_letter(right_cell_start_index) # Letter of right-side cell start idex
-rightSectionEndIndex = get_column_letter(worksheet.max_column-1) # Letter of right-side cell end idex
-leftSectionEndIndex = get_column_letter(right_cell_start_index - 2) # Letter of left-side cell end idex
-
-rightSectionWidth = worksheet.max_column - right_cell_start_index
-leftSectionWidth = right_cell_start_index - 5
-
-cell_range = '{}4:{}{}'.format(rightSectionStartIndex, rightSectionEndIndex, worksheet.max_row)
-rows = worksheet[cell_range]
-rows = list(rows)
-border = Border(
-    left=Side(),
-    right=Side(),
-    top=Side(),
-    bottom=Side()
-)
-lastCol = 5 # Use the default value, if right-side cell section is blank
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        if cell.value is not None:
-            lastCol = pos1 + 5 # Index of last row of right-hand cell section
-rightSectionRange = '{}2:{}{}'.format(rightSectionStartIndex, rightSectionEndIndex, worksheet.max_row)
-for row in worksheet[rightSectionRange]:
-    for cell in row:
-        cell.value = None
-        cell.border = border
-        cell.fill = PatternFill()
-
-# If width of left-side section is larger the right-side section, adjust width of right-side section
-right_cell_add_cols = 0
-if leftSectionWidth > rightSectionWidth:
-    right_cell_add_cols = leftSectionWidth - rightSectionWidth
-
-f = open(open_modem, 'r+')
-data = f.readlines() # read all lines at once
-print("Reading Modem log data from '{}'\n".format(open_modem.split('/')[-1]))
-
-# Counting max row width of data in the source modem log
-modem_max_width = 0
-for i in range(len(data)): # i = row index, j = column index, row = cell value
-    row = data[i].split('\t')
-    for j in range(len(row)):
-        if len(row) > modem_max_width:
-            modem_max_width = len(row)
-
-# If max width of data in modem log is wider than left-side section, adjust the width of gray background section
-left_cell_add_cols = 0
-if modem_max_width > leftSectionWidth:
-    left_cell_add_cols = modem_max_width - leftSectionWidth
-
-# Set gray color for adjusted extra cell section
-extra_gray_range = "{}1:{}{}".format(get_column_letter(worksheet.max_column + 1), get_column_letter(worksheet.max_column + right_cell_add_cols + left_cell_add_cols), worksheet.max_row)
-set_cells_color(extra_gray_range, gray_color_string)
-
-# Set gray color for right-side cell section
-set_cells_color(rightSectionRange, gray_color_string)
-
-# Copy left Modem log to right-side cell section
-cell_range = 'D4:{}{}'.format(leftSectionEndIndex, worksheet.max_row)
-rows = worksheet[cell_range]
-rows = list(rows)
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        if cell.value is not None:
-            lastCol = pos1 + 5
-
-# Store data from cell section A to a list
-cell_range = 'D4:{}{}'.format(leftSectionEndIndex, lastCol)
-rows = worksheet[cell_range]
-rows = list(rows)
-translated = []
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        if cell.value is None:
-            cell.value = ''
-        translated.append(cell.value)
-        # Clear data and border setting in left-hand side cells
-        cell.value = None
-        cell.border = border
-
-# Set gray color for left-hand cell section
-set_cells_color(cell_range, gray_color_string)
-
-# Set gray color to background section
-# If max_row of gray background is larger then data cell section, delete extra gray rows
-if worksheet.max_row > max(lastCol, len(data) + 4) + 1:
-    extraCellstartIndex = max(lastCol, len(data) + 4) + 2
-    extraCellEndIndex = worksheet.max_row
-    grayCellMargin = worksheet.max_column
-    clear_extra_cells("A{}:{}{}".format(extraCellstartIndex - 1, get_column_letter(grayCellMargin), extraCellEndIndex))
-    set_cells_color("A{}:{}{}".format(extraCellstartIndex - 1, get_column_letter(grayCellMargin), extraCellstartIndex - 1), gray_color_string)
-else:
-    # If max_row of gray background is shorter then data cell section, fill in gray background
-    margin_bottom_rows = 1 # Can customize the margin bottom row value
-    cell_range = "A{}:{}{}".format(worksheet.max_row, get_column_letter(worksheet.max_column), max(lastCol, len(data) + 4) + margin_bottom_rows)
-    set_cells_color(cell_range, gray_color_string)
-
-# Adjust bandwidth of the two cell sections
-rightSectionEndIndex = get_column_letter(worksheet.max_column - 1)
-if left_cell_add_cols is not 0:
-    # Adjust the start index of right-side cell section
-    rightSectionStartIndex = get_column_letter(right_cell_start_index + left_cell_add_cols)
-    # Adjust the end index of left-side cell section
-    leftSectionEndIndex = get_column_letter(right_cell_start_index - 2 + left_cell_add_cols)
-
-# Paste data from list to right-side cell section
-cell_range = '{}4:{}{}'.format(rightSectionStartIndex, rightSectionEndIndex, lastCol)
-rows = worksheet[cell_range]
-rows = list(rows)
-for pos1, cells in enumerate(rows):
-    for pos2, cell in enumerate(cells):
-        cell.value = translated.pop(0)
-        # Fill white color background to each cell
-        cell.fill = PatternFill(fill_type="solid", start_color='FF' + white_color_string, end_color='FF' + white_color_string)
-
-# Copy header value from left-side to right-side section, then set border style and cell color
-header_cell1 = worksheet['{}2'.format(rightSectionStartIndex)]
-header_cell2 = worksheet['{}3'.format(rightSectionStartIndex)]
-header_cell1.value = worksheet['D2'].value
-header_cell2.value = worksheet['D3'].value
-right_section_header_range1 = '{}2:{}2'.format(rightSectionStartIndex, rightSectionEndIndex)
-right_section_header_range2 = '{}3:{}3'.format(rightSectionStartIndex, rightSectionEndIndex)
-set_border(worksheet, right_section_header_range1, False)
-set_border(worksheet, right_section_header_range2, False)
-set_cells_color(right_section_header_range1, navy_color_string)
-set_cells_color(right_section_header_range2, cyan_color_string)
-
-# Set font color to white and bold style for two header columns
-header_cell1.font = Font(color = "FFFFFF")
-header_cell1.font = header_cell1.font.copy(name='Times New Roman', bold=True, italic=False)
-header_cell2.font = Font(color = "000000")
-header_cell2.font = header_cell2.font.copy(name='Times New Roman', bold=True, italic=False, size=14)
-
-# Apply border style to right-hand cell section
-set_border(worksheet, cell_range, False)
-
-# Copy data from source Modem log file into left-hand cell section
-for i in range(len(data)): # i = row index, j = column index, row = cell value
-    # This will return a line of string data, may need to convert to other formats depending on use case
-    row = data[i].split('\t')
-    for j in range(len(row)):
-        # Check and remove illegal character (ASCII)
-        filtered_string = "".join(filter(lambda x: x in string.printable, row[j]))
-        # Convert cell value that contains multiple "=" to plan text string
-        if "==" in filtered_string:
-            filtered_string = " " + filtered_string
-        # Write value to cell
-        worksheet.cell(row = i+4, column = j+4).value = filtered_string
-
-# Apply white background color and set border to left-hand cell section
-cell_range = 'D4:{}{}'.format(leftSectionEndIndex, len(data) + 4)
-set_cells_color(cell_range, white_color_string)
-set_border(worksheet, cell_range, False)
-
-# Set header value for left-side section, and set border style and cell color
-worksheet['D2'].value = stationVersion
-left_section_header_range1 = 'D2:{}2'.format(leftSectionEndIndex)
-left_section_header_range2 = 'D3:{}3'.format(leftSectionEndIndex)
-set_border(worksheet, left_section_header_range1, False)
-set_border(worksheet, left_section_header_range2, False)
-set_cells_color(left_section_header_range1, navy_color_string)
-set_cells_color(left_section_header_range2, cyan_color_string)
-    
-# Set each column to same width and set two cell sections have same wide size
-rightSectionWidth = worksheet.max_column - right_cell_start_index
-leftSectionWidth = right_cell_start_index - 5
-col_width = 50 # The default cell width can be adjusted
-larger_one = max(rightSectionWidth, leftSectionWidth)
-set_column_width('D', leftSectionEndIndex, col_width, larger_one)
-set_column_width(rightSectionStartIndex, rightSectionEndIndex, col_width, larger_one)
-       
-print("Complete creating data in 'UART Log Check' worksheet\n")
+    # Get total row counts of source CSVLOG file
+    row_count = csvlog.row_count
 
+    # Set gray color to background section
+    margin_bottom_rows = 2 # Can customize the margin bottom row value
+    cell_range = "A16:Q{}".format(max(lastCol, row_count + 3) + margin_bottom_rows)
+    paint_background(worksheet, cell_range)
 
-# 5. Creating data in 'CSV file' sheet
-print("[Step 5] Creating data in 'CSV file' worksheet...\n")
+    # Copy left CSVLOG to right-hand side cell sections
+    for row, col in index.find(4, 9, is_total_test_time, worksheet.min_row):
+        lastCol = row - worksheet.min_row + 1
 
-# Delete current worksheet and create a new one
-workbook.remove_sheet(workbook.get_sheet_by_name('CSV file'))
-workbook.create_sheet('CSV file')
-worksheet = workbook.get_sheet_by_name('CSV file')
+    # Move values from cell range A (D:I) to cell range B (K:P)
+    cell_range = 'D4:I{}'.format(lastCol)
+    move_range(worksheet, cell_range, cols=7)
 
-csvfile = open_csv
+    # Clear border setting and set gray color for left-hand cell section
+    clear_extra_cells(worksheet, cell_range)
+    paint_background(worksheet, cell_range)
 
-print("Copying data from '{}'...\n".format(open_csv.split('/')[-1]))
+    # Fill white color background to each cell of right-hand cell section
+    set_cells_color(worksheet, 'K4:P{}'.format(lastCol), white_color_string)
 
-# Then write data into this worksheet from csv file
-with open(csvfile, newline='', encoding='utf_8') as f:
-    reader = csv.reader(f)
-    for r, row in enumerate(reader):
-        for c, col in enumerate(row):
-            worksheet.cell(row = r+1, column = c+1).value = col
+    # Copy header value from ws['D2'] to ws['K2']
+    worksheet['K2'].value = worksheet['D2'].value
 
-print("Complete creating data in 'CSV file' worksheet\n")
+    # Apply border style to right-hand cell section
+    set_border(worksheet, "K2:P2")
+    set_border(worksheet, "K3:P3")
+    set_border(worksheet, "K4:P{}".format(lastCol - 1), True, lightgray_color_string)
+    set_border(worksheet, "K{}:P{}".format(lastCol, lastCol), False, lightgray_color_string)
+    set_cells_color(worksheet, "K{}:P{}".format(lastCol, lastCol), cyan_color_string)
 
+    # Copy data from source CSVLOG file to left-hand cell section
+    for r, row in enumerate(csvlog.rows):
+        for c, value in enumerate(row):
+            this_cell = worksheet.cell(row = r+4, column = c+4)
+            this_cell.value = value
+            # Set all cells in left-side section to have same font type
+            this_cell.font = style_cache.font("000000", 'Times New Roman', False, False)
+        profiler.count('cells_written', len(row))
+
+    # Apply white background color and set border to left-hand cell section
+    set_cells_color(worksheet, "D4:I{}".format(3 + row_count - 1), white_color_string)
+    set_border(worksheet, "D4:I{}".format(3 + row_count - 1), True, lightgray_color_string)
+
+    # Apply blue background color and border to left-hand bottom cells (Total Test Time)
+    set_border(worksheet, "D{}:I{}".format(3 + row_count, 3 + row_count), False, lightgray_color_string)
+    set_cells_color(worksheet, "D{}:I{}".format(3 + row_count, 3 + row_count), cyan_color_string)
+    set_font_style(worksheet, "D{}:I{}".format(3 + row_count, 3 + row_count))
+
+    # Set data and border for 2 header cells in left-hand cell section
+    stationVersion= '{} VERSION: {}'.format(info['station_name'], info['ovl_version_name'])
+    worksheet['D2'] = stationVersion
+    worksheet['D3'] = 'CSV LOG'
+    set_border(worksheet, "D2:I2")
+    set_border(worksheet, "D3:I3")
+
+    # If max_row (gray background section) larger then data cell section, delete extra gray rows
+    if worksheet.max_row > max(lastCol, row_count + 3) + 1:
+        extraCellstartIndex = max(lastCol, row_count + 3) + 2
+        extraCellEndIndex = worksheet.max_row
+        grayCellMargin = worksheet.max_column
+        clear_extra_cells(worksheet, "A{}:{}{}".format(extraCellstartIndex, get_column_letter(grayCellMargin), extraCellEndIndex))
+
+    # Highlight what moved since the previous CSVLOG, with (absolute, relative) tolerances. The
+    # summary block of the source document is removed first, also when this build doesn't compare.
+    clear_compare_summary(worksheet)
+    if info.get('compare'):
+        compare_csvlog_sections(worksheet, csvlog, lastCol, *info['compare'])
+
+    compact_background(worksheet)
+
+    print("Complete creating data in 'CSV log comparison' worksheet\n")
+
+
+# Cell values of columns first_col..last_col in rows first_row..last_row, one list per column
+def column_values(ws, first_row, last_row, first_col, last_col):
+    cells = ws._cells
+    return [[cells[(r, c)].value if (r, c) in cells else None for r in range(first_row, last_row + 1)]
+            for c in range(first_col, last_col + 1)]
+
+# Numbers of a column as floats, NaN for text, empty and complex values
+def numeric_column(values):
+    return numpy.fromiter((v if type(v) in (int, float) else numpy.nan for v in values), float, len(values))
+
+# (name, n) for the n-th repeat of every test name, so repeated names pair up in order
+def occurrence_keys(names):
+    seen = {}
+    keys = []
+    for name in names:
+        name = '' if name is None else str(name).strip()
+        n = seen[name] = seen.get(name, -1) + 1
+        keys.append((name, n))
+    return keys
+
+# Rows and columns of the summary block of compare_csvlog_sections, S2:T11
+compare_summary_rows = range(2, 12)
+compare_summary_columns = range(19, 21)
+
+def clear_compare_summary(worksheet):
+    for r in compare_summary_rows:
+        for c in compare_summary_columns:
+            worksheet._cells.pop((r, c), None)
+
+# Compare the new CSVLOG in D:I with the previous one in K4:P{last_row}. Rows are paired by test
+# name, and the numbers of paired rows are compared a whole column at a time. A number that moved
+# by more than abs_tol + rel_tol * |previous value| is highlighted in red, tests found in one log
+# only are highlighted in yellow. A summary block is written to S2:T11.
+def compare_csvlog_sections(worksheet, csvlog, last_row, abs_tol, rel_tol):
+    if numpy is None:
+        raise ValueError("Comparing CSV logs needs the numpy package")
+
+    print("Comparing with the previous CSV log (abs tol {}, rel tol {})...\n".format(abs_tol, rel_tol))
+
+    width = 6 # Columns D:I and K:P
+    columns = [csvlog.columns[c] if c < len(csvlog.columns) else [''] * csvlog.row_count for c in range(width)]
+    previous = column_values(worksheet, 4, last_row, 11, 16)
+
+    # Pair the rows by test name
+    previous_index = dict(zip(occurrence_keys(previous[0]), itertools.count()))
+    new_keys = occurrence_keys(columns[0])
+    pairs = [(i, previous_index.pop(key)) for i, key in enumerate(new_keys) if key in previous_index]
+    new_rows = numpy.array([i for i, j in pairs], dtype=int)
+    previous_rows = numpy.array([j for i, j in pairs], dtype=int)
+    added = sorted(set(range(len(new_keys))) - set(new_rows.tolist()))
+    removed = sorted(previous_index.values())
+
+    # Deltas of all paired numbers at once, one row per column
+    new_values = numpy.vstack([numeric_column(column) for column in columns])[:, new_rows]
+    previous_values = numpy.vstack([numeric_column(column) for column in previous])[:, previous_rows]
+    with numpy.errstate(invalid='ignore'):
+        delta = new_values - previous_values
+        moved = numpy.abs(delta) > abs_tol + rel_tol * numpy.abs(previous_values)
+
+    # Highlight the moved values, and the names of the added and removed tests
+    fill = style_cache.fill(red_color_string)
+    for c, p in zip(*numpy.nonzero(moved)):
+        worksheet.cell(row = int(new_rows[p]) + 4, column = int(c) + 4).fill = fill
+    fill = style_cache.fill(yellow_color_string)
+    for i in added:
+        worksheet.cell(row = i + 4, column = 4).fill = fill
+    for j in removed:
+        worksheet.cell(row = j + 4, column = 11).fill = fill
+    profiler.count('cells_written', int(moved.sum()) + len(added) + len(removed))
+
+    # Total test time, the value next to the name as in Step 2
+    total = [p for p, i in enumerate(new_rows) if "total test time" in new_keys[i][0].lower()]
+    total_values = [None] * 3
+    if total:
+        p = total[0]
+        total_values = [None if numpy.isnan(v) else float(v) for v in (new_values[1, p], previous_values[1, p], delta[1, p])]
+
+    summary = [('Comparison with previous CSV log', None),
+               ('Tolerance', 'abs {} / rel {}'.format(abs_tol, rel_tol)),
+               ('Compared tests', len(pairs)),
+               ('Changed tests', int(moved.any(axis=0).sum())),
+               ('Changed values', int(moved.sum())),
+               ('New tests', len(added)),
+               ('Removed tests', len(removed)),
+               ('Total test time', total_values[0]),
+               ('Previous total test time', total_values[1]),
+               ('Total test time delta', total_values[2])]
+    for r, (label, value) in enumerate(summary):
+        worksheet.cell(row = r + 2, column = 19).value = label
+        if value is not None:
+            worksheet.cell(row = r + 2, column = 20).value = value
+    set_border(worksheet, "S2:T2")
+    set_border(worksheet, "S3:T{}".format(len(summary) + 1), True, lightgray_color_string)
+    set_font_style(worksheet, "S2:T2")
+    # Total test time delta, red if it moved
+    worksheet.cell(row = len(summary) + 1, column = 20).fill = style_cache.fill(red_color_string if total and moved[1, total[0]] else None)
+    worksheet.column_dimensions['S'].width = 26
+    worksheet.column_dimensions['T'].width = 16
+
+    print("{} of {} compared tests changed, {} new, {} removed\n".format(summary[3][1], len(pairs), len(added), len(removed)))
+
+
+# 3b. Creating data in 'CSV log units' sheet
+# CSVLOG files of many units of one station and version, as one units x tests array of floats.
+# A test is keyed by its name (and repeat, see occurrence_keys), its value is the first number
+# after the name: the measured value, or the total test time. NaN where a unit has no value.
+# Only the values of every unit are kept, so memory grows linearly with the number of units.
+class CsvLogUnits(object):
+    def __init__(self):
+        self.station_name = None
+        self.serial_nums = []
+        self.tests = {} # (test name, n) -> column
+        self.units = [] # (columns, values) of every unit
+
+    def add(self, csvlog):
+        if self.station_name is None:
+            self.station_name = csvlog.station_name
+        elif csvlog.station_name != self.station_name:
+            raise ValueError("'{}' is a CSV log of station {}, not {}".format(csvlog.path.split('/')[-1], csvlog.station_name, self.station_name))
+        names = csvlog.columns[0] if csvlog.columns else []
+        columns = numpy.array([self.tests.setdefault(key, len(self.tests)) for key in occurrence_keys(names)], dtype=int)
+        numbers = numpy.vstack([numeric_column(column) for column in csvlog.columns[1:]] or [numpy.full(len(names), numpy.nan)])
+        first = (~numpy.isnan(numbers)).argmax(axis=0) # First number of every row, NaN if it has none
+        self.serial_nums.append(csvlog.serial_num)
+        self.units.append((columns, numbers[first, numpy.arange(len(names))]))
+
+    def values(self):
+        values = numpy.full((len(self.units), len(self.tests)), numpy.nan)
+        for u, (columns, unit_values) in enumerate(self.units):
+            values[u, columns] = unit_values
+        return values
+
+def read_csvlog_units(csvlog, paths):
+    if numpy is None:
+        raise ValueError("Aggregating CSV logs needs the numpy package")
+    units = CsvLogUnits()
+    units.add(csvlog)
+    for path in paths:
+        units.add(CsvLog(path))
+    return units
+
+# Per-test statistics of a units x tests array, NaN values are left out. A value is an outlier
+# if its modified z-score 0.6745 * |value - median| / MAD (median absolute deviation) is larger
+# than outlier_z, the median and MAD are not pulled by the outliers themselves as mean and
+# standard deviation are, which matters with a few dozen units.
+def csvlog_unit_statistics(values, outlier_z):
+    present = ~numpy.isnan(values)
+    counts = present.sum(axis=0)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        mean = numpy.nansum(values, axis=0) / counts
+        std = numpy.sqrt(numpy.nansum((values - mean) ** 2, axis=0) / (counts - 1)) # Sample standard deviation
+        median = numpy.full(values.shape[1], numpy.nan)
+        mad = numpy.full(values.shape[1], numpy.nan)
+        tested = counts > 0 # nanmedian warns about tests without values
+        median[tested] = numpy.nanmedian(values[:, tested], axis=0)
+        deviation = numpy.abs(values - median)
+        mad[tested] = numpy.nanmedian(deviation[:, tested], axis=0)
+        # When more than half the units share one value the MAD is 0, the modified z-score then
+        # uses the mean absolute deviation instead. A test where all units agree has no outliers.
+        mean_ad = numpy.nansum(deviation, axis=0) / counts
+        z = numpy.where(mad > 0, 0.6745 * deviation / mad, deviation / (1.253314 * mean_ad))
+        outliers = z > outlier_z
+    return {'count': counts, 'min': numpy.fmin.reduce(values, axis=0), 'max': numpy.fmax.reduce(values, axis=0),
+            'mean': mean, 'std': std, 'outliers': outliers}
+
+# A float of a statistics array for a cell, None for NaN
+def cell_number(value):
+    return None if numpy.isnan(value) else float(value)
+
+# The values of every unit next to their per-test min, max, mean, standard deviation and outlier
+# count, outliers are highlighted in red. Removes the sheet of the previous document without units.
+def create_csvlog_units_sheet(workbook, info, units, outlier_z):
+    if 'CSV log units' in workbook.get_sheet_names():
+        workbook.remove_sheet(workbook.get_sheet_by_name('CSV log units'))
+    if units is None:
+        return
+
+    print("[Step 3b] Creating data in 'CSV log units' worksheet...\n")
+
+    comparison = workbook.get_sheet_by_name('CSV log comparison')
+    worksheet = workbook.create_sheet('CSV log units', workbook.worksheets.index(comparison) + 1)
+
+    # Tests that have a value in at least one unit, in the order they were first seen
+    values = units.values()
+    statistics = csvlog_unit_statistics(values, outlier_z)
+    tests = [name for name, n in sorted(units.tests, key=units.tests.get)]
+    kept = numpy.nonzero(statistics['count'] > 0)[0]
+
+    worksheet['D2'] = '{} VERSION: {}'.format(info['station_name'], info['ovl_version_name'])
+    headers = ['Test', 'Units', 'Min', 'Max', 'Mean', 'Std Dev', 'Outliers'] + units.serial_nums
+    for c, header in enumerate(headers):
+        worksheet.cell(row = 3, column = c+4).value = header
+
+    # Statistics and unit values, one row per test
+    fill = style_cache.fill(red_color_string)
+    unit_values = values[:, kept].T.tolist()
+    outliers = statistics['outliers'][:, kept].T
+    for r, t in enumerate(kept.tolist()):
+        row = [tests[t], int(statistics['count'][t])] + [cell_number(statistics[k][t]) for k in ['min', 'max', 'mean', 'std']]
+        row.append(int(outliers[r].sum()))
+        row.extend(None if value != value else value for value in unit_values[r]) # value != value for NaN
+        for c, value in enumerate(row):
+            if value is not None:
+                worksheet.cell(row = r+4, column = c+4).value = value
+        for u in numpy.nonzero(outliers[r])[0].tolist():
+            worksheet.cell(row = r+4, column = u+11).fill = fill
+        profiler.count('cells_written', len(row))
+
+    last_col = get_column_letter(len(headers) + 3)
+    last_row = len(kept) + 3
+    worksheet.merge_cells('D2:{}2'.format(last_col))
+    set_border(worksheet, "D2:{}2".format(last_col))
+    set_border(worksheet, "D3:{}3".format(last_col))
+    set_font_style(worksheet, "D2:{}3".format(last_col))
+    if len(kept):
+        set_border(worksheet, "D4:{}{}".format(last_col, last_row), True, lightgray_color_string)
+    for r, t in enumerate(kept.tolist()):
+        if "total test time" in tests[t].lower():
+            set_cells_color(worksheet, "D{0}:J{0}".format(r+4), cyan_color_string)
+    worksheet.column_dimensions['D'].width = 30
+    worksheet.freeze_panes = 'E4'
+
+    print("{} tests of {} units, {} outliers\n".format(len(kept), len(units.units), int(outliers.sum())))
+    print("Complete creating data in 'CSV log units' worksheet\n")
+
+
+# Modem log reader, counts lines and max row width in one pass without keeping the lines in memory
+# With keep_lines=True, the lines are kept for rows() while they take up to preload_max_bytes.
+class ModemLog(object):
+    def __init__(self, path, keep_lines=False):
+        self.path = path
+        self.line_count = 0
+        self.max_width = 0
+        self.lines = None
+        profiler.read(path)
+        if not keep_lines or os.path.getsize(path) > preload_max_bytes:
+            self.line_count, self.max_width = scan_modem_log(path)
+            return
+
+        # Lines are dropped once they take more than preload_max_bytes
+        self.lines = []
+        kept = 0
+        with open_input(path) as f:
+            for line in f:
+                self.line_count += 1
+                width = line.count('\t') + 1
+                if width > self.max_width:
+                    self.max_width = width
+                if self.lines is not None:
+                    self.lines.append(line)
+                    kept += sys.getsizeof(line) + 8
+                    if kept > preload_max_bytes:
+                        self.lines = None
+
+    # Cleaned cell values of each line, read lazily from the file
+    def rows(self):
+        if self.lines is not None:
+            for line in self.lines:
+                yield split_modem_line(line)
+            return
+        profiler.read(self.path)
+        with open_input(self.path) as f:
+            for line in f:
+                yield split_modem_line(line)
+
+# Write the rest of the modem log into a continuation sheet with the same header and border layout
+def create_uart_continuation_sheet(workbook, worksheet, sheet_num, rows, row_count, leftSectionEndIndex):
+    title = "{} ({})".format(worksheet.title, sheet_num)
+    continuation = workbook.create_sheet(title, workbook.worksheets.index(worksheet) + sheet_num - 1)
+    marginIndex = get_column_letter(column_index_from_string(leftSectionEndIndex) + 1)
+
+    # Set gray color to background section
+    paint_background(continuation, "A1:{}{}".format(marginIndex, row_count + 5))
+
+    for i, row in enumerate(rows):
+        for j in range(len(row)):
+            continuation.cell(row = i+4, column = j+4).value = row[j]
+        profiler.count('cells_written', len(row))
+
+    # Apply white background color and set border to data cell section
+    cell_range = 'D4:{}{}'.format(leftSectionEndIndex, row_count + 4)
+    set_cells_color(continuation, cell_range, white_color_string)
+    set_border(continuation, cell_range, False)
+
+    # Same header cells as the first sheet
+    continuation['D2'].value = worksheet['D2'].value
+    continuation['D3'].value = worksheet['D3'].value
+    continuation['D2'].font = style_cache.font("FFFFFF", 'Times New Roman', True, False)
+    continuation['D3'].font = style_cache.font("000000", 'Times New Roman', True, False, 14)
+    header_range1 = 'D2:{}2'.format(leftSectionEndIndex)
+    header_range2 = 'D3:{}3'.format(leftSectionEndIndex)
+    set_border(continuation, header_range1, False)
+    set_border(continuation, header_range2, False)
+    set_cells_color(continuation, header_range1, navy_color_string)
+    set_cells_color(continuation, header_range2, cyan_color_string)
+
+    # Same column widths as the first sheet
+    for i in range(1, column_index_from_string(marginIndex) + 1):
+        width = worksheet.column_dimensions[get_column_letter(i)].width
+        if width:
+            continuation.column_dimensions[get_column_letter(i)].width = width
+
+    compact_background(continuation)
+
+    print("Continued modem log in '{}' worksheet\n".format(title))
 
-# 6. Save changes to the created new verification file
-target_filename = "QTVerification_{}_{}.xlsx".format(station_name, ovl_version_name)
-workbook.save(target_filename)
+# 4. Creating data in 'UART Log Check' sheet
+def create_uart_log_sheet(workbook, info, modem):
+    print("[Step 4] Creating data in 'UART Log Check' worksheet...\n")
+
+    # Remove continuation sheets of the previous modem log
+    for sheet in [ws for ws in workbook.worksheets if re.match(r"UART Log Check \(\d+\)$", ws.title)]:
+        workbook.remove_sheet(sheet)
+
+    worksheet = workbook.get_sheet_by_name('UART Log Check')
+    expand_background(worksheet)
+
+    # Clear the data in right-side cell section
+    index = SheetIndex(worksheet)
+    for row, col in index.find(1, worksheet.max_column - 1, lambda value: str(value).lower() == "uart log", 3, 3):
+        right_cell_start_index = col
+
+    rightSectionStartIndex = get_column_letter(right_cell_start_index) # Letter of right-side cell start idex
+    rightSectionEndIndex = get_column_letter(worksheet.max_column-1) # Letter of right-side cell end idex
+    leftSectionEndIndex = get_column_letter(right_cell_start_index - 2) # Letter of left-side cell end idex
+
+    rightSectionWidth = worksheet.max_column - right_cell_start_index
+    leftSectionWidth = right_cell_start_index - 5
+
+    border = style_cache.border()
+    lastCol = 5 # Use the default value, if right-side cell section is blank
+    last_row = index.last_row(right_cell_start_index, worksheet.max_column - 1, 4)
+    if last_row is not None:
+        lastCol = last_row + 1 # Index of last row of right-hand cell section
+    rightSectionRange = '{}2:{}{}'.format(rightSectionStartIndex, rightSectionEndIndex, worksheet.max_row)
+    for row in worksheet[rightSectionRange]:
+        for cell in row:
+            cell.value = None
+            cell.border = border
+            cell.fill = style_cache.fill()
+
+    # If width of left-side section is larger the right-side section, adjust width of right-side section
+    right_cell_add_cols = 0
+    if leftSectionWidth > rightSectionWidth:
+        right_cell_add_cols = leftSectionWidth - rightSectionWidth
+
+    # Lines and max row width of data in the source modem log (ModemLog)
+    modem_max_width = modem.max_width
+    print("Reading Modem log data from '{}'\n".format(modem.path.split('/')[-1]))
+
+    # Rows of the modem log written to this sheet, the rest goes to continuation sheets
+    sheet_rows = min(modem.line_count, uart_log_max_rows)
+
+    # If max width of data in modem log is wider than left-side section, adjust the width of gray background section
+    left_cell_add_cols = 0
+    if modem_max_width > leftSectionWidth:
+        left_cell_add_cols = modem_max_width - leftSectionWidth
+
+    # Set gray color for adjusted extra cell section
+    extra_gray_range = "{}1:{}{}".format(get_column_letter(worksheet.max_column + 1), get_column_letter(worksheet.max_column + right_cell_add_cols + left_cell_add_cols), worksheet.max_row)
+    paint_background(worksheet, extra_gray_range)
+
+    # Set gray color for right-side cell section
+    paint_background(worksheet, rightSectionRange)
+
+    # Copy left Modem log to right-side cell section
+    last_row = index.last_row(4, column_index_from_string(leftSectionEndIndex), 4)
+    if last_row is not None:
+        lastCol = last_row + 1
+
+    # Clear border setting and set gray color for left-hand cell section, data is moved to the right later
+    previous_range = 'D4:{}{}'.format(leftSectionEndIndex, lastCol)
+    clear_extra_cells(worksheet, previous_range)
+    paint_background(worksheet, previous_range)
+
+    # Set gray color to background section
+    # If max_row of gray background is larger then data cell section, delete extra gray rows
+    if worksheet.max_row > max(lastCol, sheet_rows + 4) + 1:
+        extraCellstartIndex = max(lastCol, sheet_rows + 4) + 2
+        extraCellEndIndex = worksheet.max_row
+        grayCellMargin = worksheet.max_column
+        clear_extra_cells(worksheet, "A{}:{}{}".format(extraCellstartIndex - 1, get_column_letter(grayCellMargin), extraCellEndIndex))
+        paint_background(worksheet, "A{}:{}{}".format(extraCellstartIndex - 1, get_column_letter(grayCellMargin), extraCellstartIndex - 1))
+    else:
+        # If max_row of gray background is shorter then data cell section, fill in gray background
+        margin_bottom_rows = 1 # Can customize the margin bottom row value
+        cell_range = "A{}:{}{}".format(worksheet.max_row, get_column_letter(worksheet.max_column), max(lastCol, sheet_rows + 4) + margin_bottom_rows)
+        paint_background(worksheet, cell_range)
+
+    # Adjust bandwidth of the two cell sections
+    rightSectionEndIndex = get_column_letter(worksheet.max_column - 1)
+    if left_cell_add_cols != 0:
+        # Adjust the start index of right-side cell section
+        rightSectionStartIndex = get_column_letter(right_cell_start_index + left_cell_add_cols)
+        # Adjust the end index of left-side cell section
+        leftSectionEndIndex = get_column_letter(right_cell_start_index - 2 + left_cell_add_cols)
+
+    # Move data of cell section A to right-side cell section, and fill white color background to each cell
+    move_range(worksheet, previous_range, cols=column_index_from_string(rightSectionStartIndex) - 4)
+    cell_range = '{}4:{}{}'.format(rightSectionStartIndex, rightSectionEndIndex, lastCol)
+    set_cells_color(worksheet, cell_range, white_color_string)
+
+    # Copy header value from left-side to right-side section, then set border style and cell color
+    header_cell1 = worksheet['{}2'.format(rightSectionStartIndex)]
+    header_cell2 = worksheet['{}3'.format(rightSectionStartIndex)]
+    header_cell1.value = worksheet['D2'].value
+    header_cell2.value = worksheet['D3'].value
+    right_section_header_range1 = '{}2:{}2'.format(rightSectionStartIndex, rightSectionEndIndex)
+    right_section_header_range2 = '{}3:{}3'.format(rightSectionStartIndex, rightSectionEndIndex)
+    set_border(worksheet, right_section_header_range1, False)
+    set_border(worksheet, right_section_header_range2, False)
+    set_cells_color(worksheet, right_section_header_range1, navy_color_string)
+    set_cells_color(worksheet, right_section_header_range2, cyan_color_string)
+
+    # Set font color to white and bold style for two header columns
+    header_cell1.font = style_cache.font("FFFFFF", 'Times New Roman', True, False)
+    header_cell2.font = style_cache.font("000000", 'Times New Roman', True, False, 14)
+
+    # Apply border style to right-hand cell section
+    set_border(worksheet, cell_range, False)
+
+    # Copy data from source Modem log file into left-hand cell section
+    rows = modem.rows()
+    for i, row in enumerate(itertools.islice(rows, sheet_rows)): # i = row index, j = column index, row = cell value
+        for j in range(len(row)):
+            # Write value to cell
+            worksheet.cell(row = i+4, column = j+4).value = row[j]
+        profiler.count('cells_written', len(row))
+
+    # Apply white background color and set border to left-hand cell section
+    cell_range = 'D4:{}{}'.format(leftSectionEndIndex, sheet_rows + 4)
+    set_cells_color(worksheet, cell_range, white_color_string)
+    set_border(worksheet, cell_range, False)
+
+    # Set header value for left-side section, and set border style and cell color
+    worksheet['D2'].value = '{} VERSION: {}'.format(info['station_name'], info['ovl_version_name'])
+    left_section_header_range1 = 'D2:{}2'.format(leftSectionEndIndex)
+    left_section_header_range2 = 'D3:{}3'.format(leftSectionEndIndex)
+    set_border(worksheet, left_section_header_range1, False)
+    set_border(worksheet, left_section_header_range2, False)
+    set_cells_color(worksheet, left_section_header_range1, navy_color_string)
+    set_cells_color(worksheet, left_section_header_range2, cyan_color_string)
+
+    # Set each column to same width and set two cell sections have same wide size
+    rightSectionWidth = worksheet.max_column - right_cell_start_index
+    leftSectionWidth = right_cell_start_index - 5
+    col_width = 50 # The default cell width can be adjusted
+    larger_one = max(rightSectionWidth, leftSectionWidth)
+    set_column_width(worksheet, 'D', leftSectionEndIndex, col_width, larger_one)
+    set_column_width(worksheet, rightSectionStartIndex, rightSectionEndIndex, col_width, larger_one)
+
+    # Continue the rest of the modem log in 'UART Log Check (2)', 'UART Log Check (3)', ...
+    remaining = modem.line_count - sheet_rows
+    sheet_num = 1
+    while remaining > 0:
+        sheet_num += 1
+        row_count = min(remaining, uart_log_max_rows)
+        create_uart_continuation_sheet(workbook, worksheet, sheet_num, itertools.islice(rows, row_count), row_count, leftSectionEndIndex)
+        remaining -= row_count
+    rows.close()
+
+    compact_background(worksheet)
+
+    print("Complete creating data in 'UART Log Check' worksheet\n")
 
-print("Verification document '{}' is successfully created!\n".format(target_filename))
+
+# 5. Creating data in 'CSV file' sheet
+# The rows of a .csv file, or None if they take more than preload_max_bytes
+def read_csv_rows(path):
+    if os.path.getsize(path) > preload_max_bytes:
+        return None
+    profiler.read(path)
+    rows = []
+    kept = 0
+    with open_input(path, newline='', encoding='utf_8') as f:
+        for row in csv.reader(f):
+            rows.append(row)
+            kept += sys.getsizeof(row) + sum(map(sys.getsizeof, row)) + 8
+            if kept > preload_max_bytes:
+                return None
+    return rows
+
+# With rows=None, the rows are read from open_csv while they are written
+def create_csv_file_sheet(workbook, open_csv, stream_csv=False, rows=None):
+    print("[Step 5] Creating data in 'CSV file' worksheet...\n")
+
+    # Delete current worksheet and create a new one
+    workbook.remove_sheet(workbook.get_sheet_by_name('CSV file'))
+    workbook.create_sheet('CSV file')
+    worksheet = workbook.get_sheet_by_name('CSV file')
+
+    # Leave the sheet empty, rows are streamed into the saved file by save_document (save_patched with --patch-xlsx)
+    if stream_csv:
+        print("Data from '{}' will be streamed while saving\n".format(open_csv.split('/')[-1]))
+        return
+
+    csvfile = open_csv
+
+    print("Copying data from '{}'...\n".format(open_csv.split('/')[-1]))
+
+    # Then write data into this worksheet from csv file
+    def write_rows(reader):
+        for r, row in enumerate(reader):
+            for c, col in enumerate(row):
+                worksheet.cell(row = r+1, column = c+1).value = col
+            profiler.count('cells_written', len(row))
+
+    if rows is not None:
+        write_rows(rows)
+    else:
+        profiler.read(csvfile)
+        with open_input(csvfile, newline='', encoding='utf_8') as f:
+            write_rows(csv.reader(f))
+
+    print("Complete creating data in 'CSV file' worksheet\n")
+
+
+# Worksheet rows of a .csv file as XML with inline strings, one row at a time
+def iter_csv_rows_xml(open_csv):
+    profiler.read(open_csv)
+    with open_input(open_csv, newline='', encoding='utf_8') as f:
+        reader = csv.reader(f)
+        for r, row in enumerate(reader):
+            cells = []
+            for c, col in enumerate(row):
+                coordinate = '{}{}'.format(get_column_letter(c+1), r+1)
+                if not col:
+                    cells.append('<c r="{}"/>'.format(coordinate))
+                    continue
+                if ILLEGAL_CHARACTERS_RE.search(col):
+                    raise IllegalCharacterError
+                cells.append('<c r="{}" t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(coordinate, escape(col)))
+            profiler.count('cells_written', len(row))
+            yield '<row r="{}">{}</row>'.format(r+1, ''.join(cells)).encode('utf-8')
+
+# Write the sheet XML with the rows of open_csv streamed into its empty sheetData
+def write_streamed_sheet(zout, part, sheet_xml, open_csv, date_time, compress_level=None):
+    # Split the empty sheet around its sheetData and drop the stale dimension
+    sheet_xml = re.sub(r'<dimension [^>]*/>', '', sheet_xml)
+    head, tail = re.split(r'<sheetData\s*/>|<sheetData>\s*</sheetData>', sheet_xml)
+    info = zipfile.ZipInfo(part, date_time)
+    info.compress_type = zipfile.ZIP_STORED if compress_level == 0 else zipfile.ZIP_DEFLATED
+    info._compresslevel = compress_level
+    with zout.open(info, 'w', force_zip64=True) as out:
+        out.write(head.encode('utf-8') + b'<sheetData>')
+        for row_xml in iter_csv_rows_xml(open_csv):
+            out.write(row_xml)
+        out.write(b'</sheetData>' + tail.encode('utf-8'))
+
+# Fast save: openpyxl writes the parts of the document uncompressed into a temporary file, then
+# they are deflated at compress_level on a thread pool (zlib releases the GIL) and written out in
+# order. compress_level=0 stores them uncompressed, for drafts. With compress_level=None every
+# member is deflated on this thread with the zipfile default, as workbook.save() does.
+def write_workbook_parts(workbook, fileobj):
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        ExcelWriter(workbook).write_data(archive)
+    fileobj.seek(0)
+    return fileobj
+
+# (compress type, compressed data, CRC) of a member
+def deflate_member(data, compress_level):
+    if compress_level == 0:
+        return zipfile.ZIP_STORED, data, zlib.crc32(data)
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    return zipfile.ZIP_DEFLATED, compressor.compress(data) + compressor.flush(), zlib.crc32(data)
+
+# Append a member from already compressed chunks, as ZipFile.write would have written it
+def append_raw_member(target, member, chunks):
+    member.header_offset = target.fp.tell()
+    target.fp.write(member.FileHeader())
+    for chunk in chunks:
+        target.fp.write(chunk)
+    target.filelist.append(member)
+    target.NameToInfo[member.filename] = member
+    target.start_dir = target.fp.tell()
+    target._didModify = True
+
+# Writes the members of an archive in order, while the members queued after the one being written
+# are compressed on the pool. At most max_pending members are held in memory.
+class MemberWriter(object):
+    def __init__(self, out, compress_level=None, max_pending=None):
+        self.out = out
+        self.compress_level = compress_level
+        self.pool = ThreadPoolExecutor(max_workers=os.cpu_count()) if compress_level is not None else None
+        self.max_pending = max_pending or 2 * (os.cpu_count() or 1)
+        self.pending = []
+
+    def write(self, name, date_time, data):
+        if self.pool is None:
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self.add(lambda: self.out.writestr(info, data))
+            return
+        future = self.pool.submit(deflate_member, data, self.compress_level)
+        def write_deflated():
+            compress_type, compressed, crc = future.result()
+            member = zipfile.ZipInfo(name, date_time)
+            member.external_attr = 0o600 << 16 # As writestr() sets it
+            member.compress_type = compress_type
+            member.file_size = len(data)
+            member.compress_size = len(compressed)
+            member.CRC = crc
+            append_raw_member(self.out, member, [compressed])
+        self.add(write_deflated)
+
+    def copy(self, source, item):
+        self.add(lambda: copy_zip_member(source, self.out, item))
+
+    def stream(self, part, sheet_xml, open_csv, date_time):
+        self.add(lambda: write_streamed_sheet(self.out, part, sheet_xml, open_csv, date_time, self.compress_level))
+
+    def add(self, write):
+        self.pending.append(write)
+        if self.pool is None or len(self.pending) > self.max_pending:
+            self.flush()
+
+    def flush(self):
+        for write in self.pending:
+            write()
+        self.pending = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+# Save the workbook with the members compressed at compress_level (see write_workbook_parts).
+# With stream_title, the rows of open_csv are streamed into that empty worksheet, so the cells of
+# the csv file are never held in memory.
+def save_document(workbook, filename, compress_level=None, stream_title=None, open_csv=None):
+    with tempfile.TemporaryFile() as generated:
+        with zipfile.ZipFile(write_workbook_parts(workbook, generated)) as zin, zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as zout:
+            writer = MemberWriter(zout, compress_level)
+            part = find_sheet_part(zin, stream_title) if stream_title else None
+            for item in zin.infolist():
+                if item.filename == part:
+                    writer.stream(part, zin.read(part).decode('utf-8'), open_csv, item.date_time)
+                else:
+                    writer.write(item.filename, item.date_time, zin.read(item.filename))
+            writer.close()
+
+# The file a document is saved to. With atomic=True it is a temporary file next to filename that
+# is renamed to filename once complete, so folder watchers never see a half written document.
+# A partly written file is removed if saving fails.
+@contextlib.contextmanager
+def save_target(filename, atomic=False):
+    target = filename + '.tmp' if atomic else filename
+    try:
+        yield target
+    except BaseException:
+        if os.path.exists(target):
+            os.remove(target)
+        raise
+    if atomic:
+        os.replace(target, filename)
+
+
+# Patch engine: only the sheets the steps edit are loaded from the template, and the document is
+# saved as the template .xlsx with just those worksheet parts replaced. Every other member (other
+# sheets, drawings, media, theme, ...) is copied byte-for-byte without recompressing it, and the
+# styles and shared strings of the edited sheets are appended to the template's own.
+WORKSHEET_TYPE = REL_NS + "/worksheet"
+SHARED_STRINGS_TYPE = REL_NS + "/sharedStrings"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+SHARED_STRINGS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+# Containers of styles.xml in schema order, a missing one is inserted before the next present one
+style_containers = ['numFmts', 'fonts', 'fills', 'borders', 'cellStyleXfs', 'cellXfs', 'cellStyles', 'dxfs',
+                    'tableStyles', 'colors', 'extLst']
+
+edited_sheets = set(itertools.chain.from_iterable(step_sheets.values()))
+continuation_sheet_re = re.compile(r"^UART Log Check \(\d+\)$")
+
+def is_edited_sheet(title):
+    return title in edited_sheets or continuation_sheet_re.match(title) is not None
+
+def rels_part(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, '_rels', name + '.rels')
+
+# Worksheets of an .xlsx archive in workbook order, as (title, relationship id, part name, <sheet> element text)
+def sheet_parts(archive):
+    workbook_xml = archive.read('xl/workbook.xml').decode('utf-8')
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter('{%s}Relationship' % PKG_REL_NS)}
+    elements = re.findall(r'<(?:\w+:)?sheet\s[^>]*/>', workbook_xml)
+    sheets = []
+    for sheet, text in zip(ElementTree.fromstring(workbook_xml).iter('{%s}sheet' % SHEET_MAIN_NS), elements):
+        rid = sheet.get('{%s}id' % REL_NS)
+        target = targets[rid]
+        part = target[1:] if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+        sheets.append((sheet.get('name'), rid, part, text))
+    return sheets
+
+# Part name of a worksheet inside an .xlsx archive, e.g. 'xl/worksheets/sheet5.xml'
+def find_sheet_part(archive, title):
+    for name, rid, part, text in sheet_parts(archive):
+        if name == title:
+            return part
+    raise KeyError("Worksheet '{}' does not exist".format(title))
+
+# The template without the worksheets no step edits (and without binary members), for openpyxl to load
+def read_patch_source(path):
+    profiler.read(path)
+    source = io.BytesIO()
+    with zipfile.ZipFile(path) as zin, zipfile.ZipFile(source, 'w', zipfile.ZIP_STORED) as zout:
+        skipped = set()
+        for title, rid, part, text in sheet_parts(zin):
+            if not is_edited_sheet(title):
+                skipped.update([part, rels_part(part)])
+        for item in zin.infolist():
+            if item.filename not in skipped and item.filename.endswith(('.xml', '.rels')):
+                zout.writestr(item.filename, zin.read(item.filename))
+    source.seek(0)
+    return source
+
+# Copy a member to another archive without decompressing and recompressing it
+def copy_zip_member(source, target, item):
+    if item.flag_bits & 0x1:
+        raise ValueError("Encrypted member '{}' cannot be copied".format(item.filename))
+    source.fp.seek(item.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(item.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+
+    member = copy.copy(item)
+    member.flag_bits &= ~0x8 # Sizes and CRC go in the local header, no data descriptor
+    def chunks():
+        remaining = item.compress_size
+        while remaining:
+            chunk = source.fp.read(min(remaining, 1 << 20))
+            yield chunk
+            remaining -= len(chunk)
+    append_raw_member(target, member, chunks())
+
+# Comparable form of a style element, child order is ignored
+def element_key(element):
+    return (element.tag, tuple(sorted(element.attrib.items())), tuple(sorted(element_key(child) for child in element)))
+
+def style_items(root, container, tag):
+    node = root.find('{%s}%s' % (SHEET_MAIN_NS, container))
+    return [] if node is None else node.findall('{%s}%s' % (SHEET_MAIN_NS, tag))
+
+def shared_strings_part(archive):
+    types = ElementTree.fromstring(archive.read('[Content_Types].xml'))
+    for override in types.iter('{%s}Override' % CONTENT_TYPES_NS):
+        if override.get('ContentType') == SHARED_STRINGS_CONTENT_TYPE:
+            return override.get('PartName').lstrip('/')
+    return None
+
+# Map every generated item to an equal template item, or to a new one appended to `appended`
+def merge_style_items(source_items, generated_items, appended):
+    keys = {}
+    for i, item in enumerate(source_items):
+        keys.setdefault(element_key(item), i)
+    mapping = []
+    for item in generated_items:
+        key = element_key(item)
+        if key not in keys:
+            keys[key] = len(source_items) + len(appended)
+            appended.append(item)
+        mapping.append(keys[key])
+    return mapping
+
+# Element of the spreadsheet namespace as XML text, declaring the namespace as default
+def element_xml(element, declare=True):
+    attributes = ''.join(' {}={}'.format(k.replace('{%s}' % XML_NS, 'xml:'), quoteattr(v)) for k, v in element.attrib.items())
+    if declare:
+        attributes = ' xmlns="{}"'.format(SHEET_MAIN_NS) + attributes
+    content = escape(element.text or '') + ''.join(element_xml(child, False) + escape(child.tail or '') for child in element)
+    return '<{0}{1}>{2}</{0}>'.format(element.tag.split('}')[-1], attributes, content)
+
+# Append elements to a container of a part, creating the container if the part has none
+def append_to_container(xml, container, elements, count, following):
+    if not elements:
+        return xml
+    text = ''.join(element_xml(e) for e in elements)
+    match = re.search(r'<((?:\w+:)?){}\b([^>]*?)\s*(/?)>'.format(container), xml)
+    if match is None:
+        match = re.search(r'<((?:\w+:)?)(?:{})\b|</(?:\w+:)?\w+>\s*$'.format('|'.join(following)), xml)
+        return '{}<{}{} xmlns="{}" count="{}">{}</{}{}>{}'.format(xml[:match.start()], match.group(1) or '', container, SHEET_MAIN_NS,
+                                                                  count, text, match.group(1) or '', container, xml[match.start():])
+    prefix, attributes = match.group(1), re.sub(r'\s*\bcount="\d*"', '', match.group(2))
+    opening = '<{}{}{} count="{}">'.format(prefix, container, attributes, count)
+    if match.group(3):
+        return xml[:match.start()] + opening + text + '</{}{}>'.format(prefix, container) + xml[match.end():]
+    end = xml.index('</{}{}>'.format(prefix, container), match.end())
+    return xml[:match.start()] + opening + xml[match.end():end] + text + xml[end:]
+
+# Append the styles used by the generated sheets to the template's styles.xml. Returns the new
+# styles.xml and the generated -> merged index maps of cell formats and differential formats.
+def merge_styles(source_xml, generated_xml):
+    source, generated = ElementTree.fromstring(source_xml), ElementTree.fromstring(generated_xml)
+    appended = {container: [] for container in style_containers}
+    font_map = merge_style_items(style_items(source, 'fonts', 'font'), style_items(generated, 'fonts', 'font'), appended['fonts'])
+    fill_map = merge_style_items(style_items(source, 'fills', 'fill'), style_items(generated, 'fills', 'fill'), appended['fills'])
+    border_map = merge_style_items(style_items(source, 'borders', 'border'), style_items(generated, 'borders', 'border'), appended['borders'])
+    dxf_map = merge_style_items(style_items(source, 'dxfs', 'dxf'), style_items(generated, 'dxfs', 'dxf'), appended['dxfs'])
+
+    # Custom number formats are matched by format code
+    source_formats = style_items(source, 'numFmts', 'numFmt')
+    format_ids = {f.get('formatCode'): f.get('numFmtId') for f in source_formats}
+    next_id = max([163] + [int(i) for i in format_ids.values()]) + 1
+    format_map = {}
+    for f in style_items(generated, 'numFmts', 'numFmt'):
+        if f.get('formatCode') not in format_ids:
+            format_ids[f.get('formatCode')] = str(next_id)
+            next_id += 1
+            appended['numFmts'].append(f)
+        format_map[f.get('numFmtId')] = format_ids[f.get('formatCode')]
+        f.set('numFmtId', format_ids[f.get('formatCode')])
+
+    generated_xfs = style_items(generated, 'cellXfs', 'xf')
+    for xf in generated_xfs:
+        xf.set('fontId', str(font_map[int(xf.get('fontId', 0))]))
+        xf.set('fillId', str(fill_map[int(xf.get('fillId', 0))]))
+        xf.set('borderId', str(border_map[int(xf.get('borderId', 0))]))
+        xf.set('numFmtId', format_map.get(xf.get('numFmtId', '0'), xf.get('numFmtId', '0')))
+        xf.set('xfId', '0') # The template's 'Normal' cell style
+    xf_map = merge_style_items(style_items(source, 'cellXfs', 'xf'), generated_xfs, appended['cellXfs'])
+
+    xml = source_xml.decode('utf-8')
+    source_counts = {'numFmts': len(source_formats), 'fonts': len(style_items(source, 'fonts', 'font')),
+                     'fills': len(style_items(source, 'fills', 'fill')), 'borders': len(style_items(source, 'borders', 'border')),
+                     'cellXfs': len(style_items(source, 'cellXfs', 'xf')), 'dxfs': len(style_items(source, 'dxfs', 'dxf'))}
+    for container, count in source_counts.items():
+        xml = append_to_container(xml, container, appended[container], count + len(appended[container]),
+                                  style_containers[style_containers.index(container) + 1:])
+    return xml.encode('utf-8'), xf_map, dxf_map
+
+# Shared strings of the patched document. The strings used by the untouched template sheets keep
+# their index (pinned), since those sheets are copied as they are. The strings used by the
+# generated sheets are matched to them or fill the other slots. Strings no sheet uses any more are
+# dropped, so the table doesn't grow with every generation, freed slots below a pinned index are
+# left empty. Returns the sst part (None if there is none) and the generated -> new index map.
+def merge_shared_strings(source_xml, generated_xml, pinned, used, count):
+    def item_text(si):
+        t = si.findall('{%s}t' % SHEET_MAIN_NS)
+        return None if len(t) != 1 or len(si) != 1 else (t[0].text or '')
+
+    source_items = ElementTree.fromstring(source_xml).findall('{%s}si' % SHEET_MAIN_NS) if source_xml else []
+    generated_items = ElementTree.fromstring(generated_xml).findall('{%s}si' % SHEET_MAIN_NS) if generated_xml else []
+    items = {i: source_items[i] for i in pinned if i < len(source_items)}
+    indexes = {}
+    for i in sorted(items):
+        text = item_text(items[i])
+        if text is not None:
+            indexes.setdefault(text, i)
+    free = (i for i in itertools.count() if i not in items)
+    string_map = {}
+    for g in sorted(used):
+        text = item_text(generated_items[g])
+        if text is not None and text in indexes:
+            string_map[g] = indexes[text]
+            continue
+        i = string_map[g] = next(free)
+        items[i] = generated_items[g]
+        if text is not None:
+            indexes[text] = i
+    if not source_xml and not items:
+        return None, string_map
+
+    empty = '<si><t/></si>'
+    size = max(items) + 1 if items else 0
+    xml = ''.join(element_xml(items[i], False) if i in items else empty for i in range(size))
+    xml = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<sst xmlns="{}" count="{}" uniqueCount="{}">{}</sst>'.format(
+        SHEET_MAIN_NS, count, size, xml)
+    return xml.encode('utf-8'), string_map
+
+# Shared string indexes used by a worksheet openpyxl wrote
+def generated_string_references(sheet_xml):
+    return [int(i) for i in re.findall(r'<c [^>]*?\bt="s"[^>]*><v>(\d+)</v>', sheet_xml)]
+
+# Shared string indexes used by a worksheet part of any producer, it is parsed incrementally
+def sheet_string_references(archive, part):
+    references = []
+    with archive.open(part) as f:
+        for event, element in ElementTree.iterparse(f):
+            if element.tag == '{%s}c' % SHEET_MAIN_NS:
+                if element.get('t') == 's':
+                    value = element.find('{%s}v' % SHEET_MAIN_NS)
+                    if value is not None and value.text:
+                        references.append(int(value.text))
+                element.clear()
+    return references
+
+# Renumber the style and shared string indexes of a generated worksheet
+def remap_sheet_xml(xml, xf_map, string_map, dxf_map):
+    def remap_cell(match):
+        attributes, closing, value = match.group(1), match.group(2), match.group(3)
+        attributes = re.sub(r'\bs="(\d+)"', lambda m: 's="{}"'.format(xf_map[int(m.group(1))]), attributes)
+        if value is not None and re.search(r'\bt="s"', attributes):
+            value = str(string_map[int(value)])
+        return '<c {}{}>'.format(attributes, closing) + ('' if value is None else '<v>{}</v>'.format(value))
+
+    xml = re.sub(r'<c ([^>]*?)(/?)>(?:<v>([^<]*)</v>)?', remap_cell, xml)
+    xml = re.sub(r'(<row [^>]*?\bs=")(\d+)"', lambda m: '{}{}"'.format(m.group(1), xf_map[int(m.group(2))]), xml)
+    xml = re.sub(r'(<col [^>]*?\bstyle=")(\d+)"', lambda m: '{}{}"'.format(m.group(1), xf_map[int(m.group(2))]), xml)
+    return re.sub(r'\bdxfId="(\d+)"', lambda m: 'dxfId="{}"'.format(dxf_map[int(m.group(1))]), xml)
+
+# Save a workbook loaded from read_patch_source(source) by patching the source .xlsx. With
+# stream_title, the rows of open_csv are streamed into that (empty) worksheet.
+def save_patched(workbook, source, filename, stream_title=None, open_csv=None, compress_level=None):
+    with tempfile.TemporaryFile() as generated:
+        with zipfile.ZipFile(source) as src, zipfile.ZipFile(write_workbook_parts(workbook, generated)) as gen, \
+             zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as out:
+            writer = MemberWriter(out, compress_level)
+            write_patched_parts(workbook, src, gen, writer, stream_title, open_csv)
+            writer.close()
+
+def write_patched_parts(workbook, src, gen, writer, stream_title, open_csv):
+    source_sheets = sheet_parts(src)
+    generated_parts = {title: part for title, rid, part, text in sheet_parts(gen)}
+    for title, part in generated_parts.items():
+        if rels_part(part) in gen.namelist():
+            raise ValueError("Worksheet '{}' has comments or hyperlinks, save it without --patch-xlsx".format(title))
+
+    names = set(src.namelist())
+    workbook_rels = src.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+    content_types = src.read('[Content_Types].xml').decode('utf-8')
+    rel_ids = set(re.findall(r'\bId="([^"]*)"', workbook_rels))
+
+    # Sheet order: the workbook's sheets, each untouched sheet stays after the sheet it followed
+    titles = [sheet.title for sheet in workbook._sheets]
+    order = list(titles)
+    previous = None
+    for title, rid, part, text in source_sheets:
+        if title in titles:
+            previous = title
+        elif not is_edited_sheet(title):
+            order.insert(order.index(previous) + 1 if previous else 0, title)
+            previous = title
+
+    # Edited sheets keep their part, new ones get a new part and relationship
+    by_title = {title: (rid, part, text) for title, rid, part, text in source_sheets}
+    sheet_tag = re.match(r'<((?:\w+:)?sheet)\s', source_sheets[0][3]).group(1)
+    rid_attribute = re.search(r'\s(\w+:id)=', source_sheets[0][3]).group(1)
+    sheet_id = max(int(i) for i in re.findall(r'\bsheetId="(\d+)"', ''.join(s[3] for s in source_sheets)))
+    replaced, removed, new_parts, elements = {}, set(), [], []
+    for title in order:
+        if title in by_title:
+            elements.append(by_title[title][2])
+            if title not in titles:
+                continue
+            part = by_title[title][1]
+            removed.add(rels_part(part)) # Relationships of the template sheet, e.g. its drawing
+        else:
+            part = next('xl/worksheets/sheet{}.xml'.format(n) for n in itertools.count(1) if 'xl/worksheets/sheet{}.xml'.format(n) not in names)
+            rid = next('rId{}'.format(n) for n in itertools.count(1) if 'rId{}'.format(n) not in rel_ids)
+            names.add(part)
+            rel_ids.add(rid)
+            sheet_id += 1
+            elements.append('<{} name="{}" sheetId="{}" {}="{}"/>'.format(sheet_tag, escape(title, {'"': '&quot;'}), sheet_id, rid_attribute, rid))
+            new_parts.append(part)
+            workbook_rels = workbook_rels.replace('</Relationships>', '<Relationship Id="{}" Type="{}" Target="{}"/></Relationships>'.format(
+                rid, WORKSHEET_TYPE, posixpath.relpath(part, 'xl')))
+            content_types = content_types.replace('</Types>', '<Override PartName="/{}" ContentType="{}"/></Types>'.format(part, WORKSHEET_CONTENT_TYPE))
+        replaced[part] = (title, gen.read(generated_parts[title]).decode('utf-8'))
+
+    # Sheets the steps removed, e.g. old 'UART Log Check (n)' continuation sheets, and calcChain
+    removed_ids = [rid for title, rid, part, text in source_sheets if title not in order]
+    removed.update(p for title, rid, p, text in source_sheets if title not in order)
+    removed.update(rels_part(p) for title, rid, p, text in source_sheets if title not in order)
+    for rel in re.findall(r'<Relationship\b[^>]*/>', workbook_rels):
+        if re.search(r'\bType="[^"]*/calcChain"', rel):
+            removed_ids.append(re.search(r'\bId="([^"]*)"', rel).group(1))
+            removed.add('xl/calcChain.xml') # Cell order of the old formulas, Excel rebuilds it
+    for rid in removed_ids:
+        workbook_rels = re.sub(r'<Relationship\b[^>]*?\bId="{}"[^>]*/>'.format(re.escape(rid)), '', workbook_rels)
+    for part in removed:
+        content_types = re.sub(r'<Override\b[^>]*?\bPartName="/{}"[^>]*/>'.format(re.escape(part)), '', content_types)
+
+    # Workbook: new sheet list, sheet-scoped names follow their sheet, recalculate on open
+    workbook_xml = src.read('xl/workbook.xml').decode('utf-8')
+    source_titles = [title for title, rid, part, text in source_sheets]
+    def scoped_name(match):
+        local = re.search(r'\blocalSheetId="(\d+)"', match.group(0))
+        if local is None:
+            return match.group(0)
+        title = source_titles[int(local.group(1))]
+        if title not in order:
+            return ''
+        return match.group(0).replace(local.group(0), 'localSheetId="{}"'.format(order.index(title)))
+    workbook_xml = re.sub(r'<(\w+:)?definedName\b[^>]*>.*?</\1definedName>', scoped_name, workbook_xml, flags=re.S)
+    start = workbook_xml.index(source_sheets[0][3])
+    end = workbook_xml.index(source_sheets[-1][3]) + len(source_sheets[-1][3])
+    workbook_xml = workbook_xml[:start] + ''.join(elements) + workbook_xml[end:]
+    workbook_xml = re.sub(r'\bactiveTab="(\d+)"', lambda m: 'activeTab="{}"'.format(min(int(m.group(1)), len(order) - 1)), workbook_xml)
+    workbook_xml = re.sub(r'<((?:\w+:)?calcPr)\b((?:(?!fullCalcOnLoad)[^>])*?)\s*/>', r'<\1\2 fullCalcOnLoad="1"/>', workbook_xml)
+
+    # Styles of the generated sheets are appended to the template's, shared strings are merged
+    # with the ones the untouched sheets use
+    styles_xml, xf_map, dxf_map = merge_styles(src.read('xl/styles.xml'), gen.read('xl/styles.xml'))
+    strings_part = shared_strings_part(src)
+    untouched = [part for title, rid, part, text in source_sheets if title in order and title not in titles]
+    pinned = [i for part in untouched for i in sheet_string_references(src, part)]
+    used = [i for title, sheet_xml in replaced.values() for i in generated_string_references(sheet_xml)]
+    strings_xml, string_map = merge_shared_strings(src.read(strings_part) if strings_part else None,
+                                                   gen.read(shared_strings_part(gen)) if shared_strings_part(gen) else None,
+                                                   set(pinned), set(used), len(pinned) + len(used))
+    if strings_xml and not strings_part:
+        strings_part = 'xl/sharedStrings.xml'
+        rid = next('rId{}'.format(n) for n in itertools.count(1) if 'rId{}'.format(n) not in rel_ids)
+        workbook_rels = workbook_rels.replace('</Relationships>', '<Relationship Id="{}" Type="{}" Target="sharedStrings.xml"/></Relationships>'.format(rid, SHARED_STRINGS_TYPE))
+        content_types = content_types.replace('</Types>', '<Override PartName="/{}" ContentType="{}"/></Types>'.format(strings_part, SHARED_STRINGS_CONTENT_TYPE))
+        new_parts.append(strings_part)
+
+    parts = {'xl/workbook.xml': workbook_xml.encode('utf-8'), 'xl/_rels/workbook.xml.rels': workbook_rels.encode('utf-8'),
+             '[Content_Types].xml': content_types.encode('utf-8'), 'xl/styles.xml': styles_xml}
+    if strings_xml:
+        parts[strings_part] = strings_xml
+
+    def write_part(name, date_time):
+        if name in replaced:
+            title, sheet_xml = replaced[name]
+            sheet_xml = remap_sheet_xml(sheet_xml, xf_map, string_map, dxf_map)
+            if title == stream_title:
+                writer.stream(name, sheet_xml, open_csv, date_time)
+                return
+            parts[name] = sheet_xml.encode('utf-8')
+        writer.write(name, date_time, parts[name])
+
+    for item in src.infolist():
+        if item.filename in removed:
+            continue
+        if item.filename in parts or item.filename in replaced:
+            write_part(item.filename, item.date_time)
+        else:
+            writer.copy(src, item)
+    for name in new_parts:
+        write_part(name, time.localtime()[:6])
+
+# Inputs parsed on worker threads while the template is loaded. The logs usually sit on network
+# shares, so the threads mostly wait on I/O and that wait overlaps with the template parse.
+class InputLoader(object):
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=3)
+        self.futures = {}
+
+    def submit(self, name, function, *args):
+        self.futures[name] = self.pool.submit(function, *args)
+
+    # The value read ahead, or function(*args) if the input was not submitted
+    def get(self, name, function, *args):
+        future = self.futures.pop(name, None)
+        return future.result() if future is not None else function(*args)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+# Options of a build that are the same for every job of a run, with their defaults. main collects
+# them from the arguments once and every mode passes them on to build_verification as they are.
+build_options = {'stream_csv': False, 'profile': False, 'cache_template': False, 'build_cache': None, 'patch_xlsx': False,
+                 'compare': None, 'compress_level': None, 'atomic_save': False, 'summary': None, 'dump_csvlog': False,
+                 'history': None, 'aggregate': None}
+
+# Run Steps 0-6 and return the filename of the created verification document.
+# With stream_csv=True, the 'CSV file' sheet is streamed into the saved document (see save_document).
+# With profile=True, the stage timings are kept in profiler.report() afterwards.
+# With cache_template=True, the parsed template is reused from template_cache.
+# With build_cache set to a folder, only the steps whose inputs changed since the last build of
+# the same template are redone.
+# With patch_xlsx=True, the document is saved by patching the template .xlsx (see save_patched).
+# With compare=(abs_tol, rel_tol), Step 3 highlights what moved since the previous CSVLOG.
+# With compress_level set, the document is saved with the fast save (see write_workbook_parts).
+# With atomic_save=True, the document is renamed into place once it is completely written.
+# With summary='json' or 'csv', a sidecar summary is written next to the document (see write_summary),
+# with dump_csvlog=True also the typed CSVLOG columns (see write_csvlog_columns).
+# With aggregate=(csvlog files, outlier_z), Step 3b aggregates the CSVLOG of this and those other units.
+# With history set to a SQLite file, the document is recorded in that version history (see VersionHistory),
+# and open_workbook may be None to build from the latest recorded document of the station.
+def build_verification(open_workbook, open_csvlog, open_modem, open_csv, testplan_ver, ovl_verify_date,
+                       reviser_name=string.capwords(getpass.getuser()), reviewer_name="Doris", output_dir=None, **options):
+    unknown = sorted(set(options) - set(build_options))
+    if unknown:
+        raise TypeError("Unknown build options: {}".format(", ".join(unknown)))
+    options = dict(build_options, **options)
+    profiler.reset(options['profile'])
+    if options['profile']:
+        tracemalloc.start()
+    # The steps get the opened build cache and version history in place of their paths
+    history = options['history'] = VersionHistory(options['history']) if options['history'] else None
+    options['build_cache'] = BuildCache(options['build_cache']) if options['build_cache'] else None
+    try:
+        if open_workbook is None:
+            open_workbook = history_source(history, open_csvlog)
+        return run_steps(open_workbook, open_csvlog, open_modem, open_csv, testplan_ver, ovl_verify_date,
+                         reviser_name, reviewer_name, output_dir, options)
+    finally:
+        if history:
+            history.close()
+        if options['profile']:
+            tracemalloc.stop()
+
+def load_template(open_workbook, cache_template, patch_xlsx):
+    if cache_template:
+        return template_cache.load(open_workbook, patch_xlsx)
+    if patch_xlsx:
+        return openpyxl.load_workbook(read_patch_source(open_workbook))
+    profiler.read(open_workbook)
+    return openpyxl.load_workbook(open_workbook)
+
+def run_steps(open_workbook, open_csvlog, open_modem, open_csv, testplan_ver, ovl_verify_date,
+              reviser_name, reviewer_name, output_dir, options):
+    build_cache, patch_xlsx, aggregate = options['build_cache'], options['patch_xlsx'], options['aggregate']
+    entry, digests = None, None
+    if build_cache:
+        with profiler.stage('input hashing'):
+            digests = {'template': file_digest(open_workbook), 'csvlog': file_digest(open_csvlog),
+                       'modem': file_digest(open_modem), 'csv': file_digest(open_csv)}
+            # Step 3b depends on the CSVLOG of this unit and the ones of the other units
+            digests['units'] = hashlib.sha1(' '.join([digests['csvlog']] + [file_digest(path) for path in aggregate[0]]).encode()).hexdigest() if aggregate else None
+            entry = build_cache.load(digests['template'])
+            if entry is not None and entry['patch_xlsx'] != patch_xlsx:
+                entry = None # Built from all sheets of the template, or from the edited ones only
+
+    # Read the inputs of the steps to run ahead, while the template is loaded
+    inputs = InputLoader()
+    try:
+        return run_loaded_steps(open_workbook, open_csvlog, open_modem, open_csv, testplan_ver, ovl_verify_date, reviser_name,
+                                reviewer_name, output_dir, options, entry, digests, inputs)
+    finally:
+        inputs.close()
+
+def run_loaded_steps(open_workbook, open_csvlog, open_modem, open_csv, testplan_ver, ovl_verify_date, reviser_name,
+                     reviewer_name, output_dir, options, entry, digests, inputs):
+    stream_csv, cache_template, patch_xlsx = options['stream_csv'], options['cache_template'], options['patch_xlsx']
+    build_cache, history, aggregate = options['build_cache'], options['history'], options['aggregate']
+    changed = [k for k in ['csvlog', 'modem', 'csv'] if entry is None or entry['digests'][k] != digests[k]]
+    if 'csvlog' in changed:
+        inputs.submit('csvlog', CsvLog, open_csvlog)
+    if 'modem' in changed:
+        inputs.submit('modem', ModemLog, open_modem, True)
+    if 'csv' in changed and not stream_csv:
+        inputs.submit('csv', read_csv_rows, open_csv)
+
+    # Load the source .xlsx template file, or the last workbook built from it
+    template = None
+    with profiler.stage('template load'):
+        if entry is None:
+            workbook = template = load_template(open_workbook, cache_template, patch_xlsx)
+        else:
+            workbook = entry['workbook']
+
+    print("\nOpening source workbook '{}'\n".format(open_workbook.split('/')[-1]))
+
+    with profiler.stage('step 0 metadata'):
+        if entry is not None and entry['digests']['csvlog'] == digests['csvlog']:
+            csvlog = None # Parsed again only if Step 3 has to be redone
+            info = {k: entry['info'][k] for k in ['station_name', 'serial_num', 'diags_version', 'total_test_time']}
+        else:
+            csvlog = inputs.get('csvlog', CsvLog, open_csvlog)
+            info = csvlog.info()
+        if entry is not None and entry['version'] == (testplan_ver, ovl_verify_date):
+            info['ovl_version_name'] = entry['info']['ovl_version_name']
+        else:
+            if template is None:
+                template = load_template(open_workbook, cache_template, patch_xlsx)
+            info['ovl_version_name'] = create_version_name(template, testplan_ver, ovl_verify_date)
+    info['ovl_verify_date'] = ovl_verify_date
+    info['reviser_name'] = reviser_name
+    info['reviewer_name'] = reviewer_name
+    info['compare'] = options['compare']
+    info['aggregate'] = (tuple(aggregate[0]), aggregate[1]) if aggregate else None
+
+    # Get date of today in a particular format
+    info['release_date'] = datetime.strftime(date.today(), "%Y/%m/%d")
+    print('---------------------------------------')
+    print('Station Name:', info['station_name'])
+    print('Version Name:', info['ovl_version_name'])
+    print('Verify Date:', datetime.strptime(ovl_verify_date, '%Y%m%d').strftime('%Y/%m/%d'))
+    print('Test Sample SN:', info['serial_num'])
+    print('Reviser:', reviser_name)
+    print('Reviewer:', reviewer_name)
+    print('Release Date', info['release_date'])
+    print('---------------------------------------\n')
+
+    if history:
+        collision = history.collision(info)
+        if collision:
+            raise ValueError(collision)
+
+    keys = {step: step_key(step, digests, info) for step in step_dependencies} if build_cache else {}
+    if stream_csv:
+        keys['step 5 csv file'] = None # The 'CSV file' sheet stays empty, its rows are streamed at save
+
+    # True if the step has to run, its sheets are then put back to the template's ones
+    def redo(step):
+        nonlocal template
+        if entry is None:
+            return True
+        if entry['keys'].get(step) == keys[step]: # Steps added since the entry was stored are redone
+            print("Reusing {} from the build cache\n".format(step))
+            return False
+        if template is None:
+            template = load_template(open_workbook, cache_template, patch_xlsx)
+        restore_template_sheets(workbook, template, step_sheets[step])
+        return True
+
+    with profiler.stage('step 1 version'):
+        if redo('step 1 version'):
+            create_version_sheet(workbook, info)
+    with profiler.stage('step 2 program verification'):
+        if redo('step 2 program verification'):
+            create_program_verification_sheet(workbook, info)
+    with profiler.stage('step 3 csv log comparison'):
+        if redo('step 3 csv log comparison'):
+            csvlog = csvlog or CsvLog(open_csvlog)
+            create_csvlog_comparison_sheet(workbook, info, csvlog)
+    with profiler.stage('step 3b csv log units'):
+        if redo('step 3b csv log units'):
+            units = read_csvlog_units(csvlog or CsvLog(open_csvlog), aggregate[0]) if aggregate else None
+            create_csvlog_units_sheet(workbook, info, units, aggregate[1] if aggregate else None)
+    with profiler.stage('step 4 uart log check'):
+        if redo('step 4 uart log check'):
+            create_uart_log_sheet(workbook, info, inputs.get('modem', ModemLog, open_modem))
+    with profiler.stage('step 5 csv file'):
+        if redo('step 5 csv file'):
+            create_csv_file_sheet(workbook, open_csv, stream_csv, None if stream_csv else inputs.get('csv', read_csv_rows, open_csv))
+
+    # 6. Save changes to the created new verification file
+    target_filename = document_filename(info, output_dir)
+    # openpyxl appends the style of every conditional format to this list each time it saves, a
+    # workbook reused from the build cache has already been saved once
+    workbook._differential_styles = []
+    with profiler.stage('save'), save_target(target_filename, options['atomic_save'] or patch_xlsx) as filename:
+        if patch_xlsx:
+            save_patched(workbook, open_workbook, filename, 'CSV file' if stream_csv else None, open_csv, options['compress_level'])
+        elif stream_csv or options['compress_level'] is not None:
+            save_document(workbook, filename, options['compress_level'], 'CSV file' if stream_csv else None, open_csv)
+        else:
+            workbook.save(filename)
+
+    if history:
+        history.record(info, target_filename, open_workbook)
+
+    if options['summary'] or options['dump_csvlog']:
+        with profiler.stage('summary'):
+            if options['summary']:
+                row_counts = sheet_row_counts(workbook, open_csv, stream_csv)
+                write_summary(target_filename, options['summary'], build_summary(info, target_filename, row_counts), options['atomic_save'])
+            if options['dump_csvlog']:
+                write_csvlog_columns(target_filename, csvlog or CsvLog(open_csvlog), options['atomic_save'])
+
+    if build_cache:
+        with profiler.stage('build cache store'):
+            build_cache.store(digests['template'], {'digests': digests, 'version': (testplan_ver, ovl_verify_date), 'patch_xlsx': patch_xlsx,
+                                                    'info': info, 'keys': keys, 'workbook': workbook})
+
+    print("Verification document '{}' is successfully created!\n".format(target_filename))
+    print("Style objects: {} created, {} reused\n".format(style_cache.created, style_cache.reused))
+    return target_filename
+
+
+# Filename of the verification document of a station and version
+def document_filename(info, output_dir=None):
+    target_filename = "QTVerification_{}_{}.xlsx".format(info['station_name'], info['ovl_version_name'])
+    if output_dir:
+        target_filename = os.path.join(output_dir, target_filename)
+    return target_filename
+
+# Version history: every document built with --history is recorded in a SQLite file with its
+# station, version name components, serial number and path. The next version of a station and
+# the document to build it from are then one lookup, without opening the previous workbook, and
+# a version name already used by the document of another unit is caught before it is overwritten.
+class VersionHistory(object):
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=30) # Batch workers record their documents concurrently
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS documents (station TEXT, version TEXT, prefix TEXT, "
+                                    "verify_date TEXT, testplan_ver TEXT, suffix TEXT, qtm_num INTEGER, serial_num TEXT, "
+                                    "path TEXT, source TEXT, created REAL, PRIMARY KEY (station, version))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS documents_qtm_num ON documents (station, qtm_num)")
+
+    def close(self):
+        self.connection.close()
+
+    # Rebuilding a version replaces its record
+    def record(self, info, target_filename, source):
+        prefix, verify_date, testplan_ver, suffix, qtm_num = split_version_name(info['ovl_version_name'])
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (info['station_name'], info['ovl_version_name'], prefix, verify_date, testplan_ver, suffix,
+                                     qtm_num, info['serial_num'], os.path.abspath(target_filename), os.path.abspath(source), time.time()))
+
+    def find(self, station_name, version_name):
+        return self.connection.execute("SELECT * FROM documents WHERE station = ? AND version = ?",
+                                       (station_name, version_name)).fetchone()
+
+    # The recorded document of a station with the highest QTM number
+    def latest(self, station_name):
+        return self.connection.execute("SELECT * FROM documents WHERE station = ? ORDER BY qtm_num DESC, created DESC LIMIT 1",
+                                       (station_name,)).fetchone()
+
+    # (next version name, document to build it from) of a station, or None if it has no recorded document
+    def plan(self, station_name, testplan_ver, ovl_verify_date):
+        latest = self.latest(station_name)
+        if latest is None:
+            return None
+        return next_version_name(latest['version'], testplan_ver, ovl_verify_date), latest['path']
+
+    # Why the version of info can't be built, or None
+    def collision(self, info):
+        row = self.find(info['station_name'], info['ovl_version_name'])
+        if row is not None and row['serial_num'] != info['serial_num']:
+            return "Version {} of station {} is already used by serial number {} in '{}'".format(
+                info['ovl_version_name'], info['station_name'], row['serial_num'], row['path'])
+        return None
+
+# The latest recorded document of the station of a CSVLOG file
+def history_source(history, open_csvlog):
+    station_name = read_csvlog_header(open_csvlog)[0]
+    latest = history.latest(station_name) if history else None
+    if latest is None:
+        raise ValueError("No document of station {} in the version history".format(station_name))
+    return latest['path']
+
+# Fields a job needs, the source may be left to the version history
+def required_job_fields(history=None):
+    return [k for k in manifest_required_fields if not (history and k == 'source')]
+
+# Sidecar files: the values of Step 0 and the size of every written sheet, and optionally the
+# typed CSVLOG columns, next to the document so MES and dashboards don't have to open the .xlsx
+summary_formats = ['json', 'csv']
+summary_fields = ['station_name', 'serial_num', 'diags_version', 'total_test_time', 'ovl_version_name',
+                  'release_date', 'ovl_verify_date', 'reviser_name', 'reviewer_name']
+
+# e.g. 'QTVerification_FCT_JH20170509ver12_TPA_005.json' for the document of the same name
+def sidecar_filename(target_filename, suffix):
+    return os.path.splitext(target_filename)[0] + suffix
+
+# Rows of every sheet the steps wrote, a streamed 'CSV file' sheet has as many rows as the csv file
+def sheet_row_counts(workbook, open_csv, stream_csv):
+    row_counts = {}
+    for worksheet in workbook.worksheets:
+        if is_edited_sheet(worksheet.title):
+            row_counts[worksheet.title] = worksheet.max_row if worksheet._cells else 0
+    if stream_csv:
+        with open_input(open_csv, newline='', encoding='utf_8') as f:
+            row_counts['CSV file'] = sum(1 for row in csv.reader(f))
+    return row_counts
+
+def build_summary(info, target_filename, row_counts):
+    summary = {k: info[k] for k in summary_fields}
+    summary['total_test_time'] = float(info['total_test_time']) # As Step 2 writes it
+    summary['document'] = os.path.basename(target_filename)
+    summary['sheet_rows'] = row_counts
+    return summary
+
+# The summary as a JSON object, or as a .csv file with a header row and one row of values
+# (with a 'rows: <sheet>' column for every sheet)
+def write_summary(target_filename, summary_format, summary, atomic=False):
+    with save_target(sidecar_filename(target_filename, '.' + summary_format), atomic) as filename:
+        with open(filename, 'w', newline='', encoding='utf_8') as f:
+            if summary_format == 'json':
+                json.dump(summary, f, indent=2)
+            else:
+                row = {k: v for k, v in summary.items() if k != 'sheet_rows'}
+                row.update(('rows: {}'.format(title), n) for title, n in summary['sheet_rows'].items())
+                writer = csv.DictWriter(f, list(row))
+                writer.writeheader()
+                writer.writerow(row)
+
+# JSON has no inf/nan, such fields are written as the text of the CSVLOG
+def json_field(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    return value
+
+# The CSVLOG as typed columns (numbers stay numbers), one list per column, in '<document>.csvlog.json'
+def write_csvlog_columns(target_filename, csvlog, atomic=False):
+    with save_target(sidecar_filename(target_filename, '.csvlog.json'), atomic) as filename:
+        with open(filename, 'w', encoding='utf_8') as f:
+            json.dump({'csvlog': os.path.basename(csvlog.path), 'rows': csvlog.row_count,
+                       'columns': [list(map(json_field, column)) for column in csvlog.columns]}, f)
+
+# Sheets Steps 1-5 expect in the template
+required_sheets = ['Version ', 'Program Verification', 'CSV log comparison', 'UART Log Check', 'CSV file']
+
+# Step 0 fields of a CSVLOG file, or None for the ones not found
+def read_csvlog_info(path):
+    info = dict.fromkeys(['station_name', 'serial_num', 'diags_version', 'total_test_time'])
+    with open_input(path, newline='', encoding='utf_8') as f:
+        for r, row in enumerate(csv.reader(f)):
+            if r == 0:
+                info['station_name'] = row[0] if len(row) > 0 else None
+                info['serial_num'] = row[2].strip('Serial Number:') if len(row) > 2 else None
+            for c, col in enumerate(row):
+                if col == "DIAGS_VERSION":
+                    info['diags_version'] = row[c + 3] if c + 3 < len(row) else None
+                elif "total test time" in col.lower():
+                    info['total_test_time'] = row[c + 1] if c + 1 < len(row) else None
+    return info
+
+# Dry run: check the arguments and inputs of a job the way the steps will use them, without
+# loading the workbook. The CSVLOG is read as text (its values are not typed), the modem log and
+# csv file are only opened, and the template is opened read-only for 'CSV log comparison'!D2,
+# the sheet names and the 'UART Log' headers.
+# {'status': 'OK', 'version': ..., 'target': ...} or {'status': 'FAILED', 'problems': [...]} of a manifest row.
+# A job without source is planned from the version history only, its template is not opened.
+def validate_job(job, history=None):
+    problems = []
+    for k in ['source', 'csvlog', 'modem', 'csv']:
+        if k == 'source' and not job.get(k):
+            continue
+        if not os.path.isfile(job[k]):
+            problems.append("{} '{}' does not exist".format(k, job[k]))
+    try:
+        datetime.strptime(job['date'], '%Y%m%d')
+    except ValueError:
+        problems.append("date '{}' is not like 20170509".format(job['date']))
+    if problems:
+        return {'status': 'FAILED', 'problems': problems}
+
+    info = {}
+    try:
+        info = read_csvlog_info(job['csvlog'])
+        for k, name in [('station_name', 'station name'), ('serial_num', 'serial number'),
+                        ('diags_version', 'DIAGS_VERSION'), ('total_test_time', 'total test time')]:
+            if not info[k]:
+                problems.append("csvlog has no {}".format(name))
+        if info['total_test_time'] and not is_number(info['total_test_time']):
+            problems.append("csvlog total test time '{}' is not a number".format(info['total_test_time']))
+    except (OSError, ValueError, UnicodeDecodeError, csv.Error) as e:
+        problems.append("csvlog cannot be read: {}".format(e))
+    for k in ['modem', 'csv']:
+        try:
+            with open_input(job[k], newline='', encoding=None if k == 'modem' else 'utf_8') as f:
+                f.readline()
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            problems.append("{} cannot be read: {}".format(k, e))
+
+    if not job.get('source'):
+        planned = history.plan(info.get('station_name'), job['ver'], job['date'])
+        if planned is None:
+            problems.append("no document of station {} in the version history".format(info.get('station_name')))
+        else:
+            info['ovl_version_name'], source = planned
+            if not os.path.isfile(source):
+                problems.append("recorded source '{}' does not exist".format(source))
+        return validated_job(job, info, problems, history)
+
+    try:
+        workbook = openpyxl.load_workbook(job['source'], read_only=True)
+    except Exception as e:
+        problems.append("source cannot be opened: {}".format(e))
+        return {'status': 'FAILED', 'problems': problems}
+    missing = [title for title in required_sheets if title not in workbook.get_sheet_names()]
+    if missing:
+        problems.append("source has no sheet {}".format(", ".join("'{}'".format(title) for title in missing)))
+    else:
+        try:
+            info['ovl_version_name'] = create_version_name(workbook, job['ver'], job['date'])
+        except (AttributeError, IndexError, ValueError):
+            problems.append("'CSV log comparison'!D2 {!r} is not like 'FCT VERSION: JH20170401ver11_TPA_004'".format(
+                workbook.get_sheet_by_name('CSV log comparison')['D2'].value))
+        worksheet = workbook.get_sheet_by_name('UART Log Check')
+        header = 'A3:{}3'.format(get_column_letter(max((worksheet.max_column or 1) - 1, 1)))
+        if not [cell for row in worksheet.iter_rows(header) for cell in row if str(cell.value).lower() == "uart log"]:
+            problems.append("'UART Log Check' has no 'UART Log' header in row 3")
+    return validated_job(job, info, problems, history)
+
+def validated_job(job, info, problems, history):
+    if history and not problems:
+        collision = history.collision(info)
+        if collision:
+            problems.append(collision)
+    if problems:
+        return {'status': 'FAILED', 'problems': problems}
+    return {'status': 'OK', 'version': info['ovl_version_name'], 'target': document_filename(info, job.get('output_dir'))}
+
+# Print the dry run of every job, True if all of them passed. Jobs that would write the same
+# document (e.g. two units built from the same previous version) fail too. The version history
+# at the path history is opened for the dry run only.
+def dry_run(jobs, history=None):
+    passed = True
+    targets = {}
+    history = VersionHistory(history) if history else None
+    try:
+        for i, job in enumerate(jobs):
+            result = validate_job(job, history)
+            if result['status'] == 'OK':
+                target = os.path.abspath(result['target'])
+                if target in targets:
+                    result = {'status': 'FAILED', 'problems': ["writes the same document as job {}".format(targets[target] + 1)]}
+                targets.setdefault(target, i)
+            if result['status'] == 'OK':
+                print("[Dry run] OK {} -> '{}'".format(job['csvlog'].split('/')[-1], result['target']))
+                continue
+            passed = False
+            print("[Dry run] FAILED {}".format(job['csvlog'].split('/')[-1]))
+            for problem in result['problems']:
+                print("    {}".format(problem))
+    finally:
+        if history:
+            history.close()
+    return passed
+
+# Read batch jobs from a .csv (with header row) or .json (list of objects) manifest
+def read_manifest(manifest, history=None):
+    if manifest.lower().endswith('.json'):
+        with open(manifest, encoding='utf_8') as f:
+            jobs = json.load(f)
+    else:
+        with open(manifest, newline='', encoding='utf_8') as f:
+            jobs = [row for row in csv.DictReader(f)]
+
+    # Paths in the manifest are relative to the manifest itself
+    manifest_dir = os.path.dirname(os.path.abspath(manifest))
+    for i, job in enumerate(jobs):
+        missing = [k for k in required_job_fields(history) if not job.get(k)]
+        if missing:
+            raise ValueError("Manifest row {} is missing: {}".format(i + 1, ", ".join(missing)))
+        for k in manifest_path_fields:
+            if job.get(k):
+                job[k] = os.path.join(manifest_dir, job[k])
+        job['ver'] = str(job['ver'])
+        job['date'] = str(job['date'])
+    return jobs
+
+# Build one manifest row, step messages are captured so workers don't interleave output
+def run_batch_job(job, options):
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            target_filename = build_verification(job.get('source'), job['csvlog'], job['modem'], job['csv'], job['ver'], job['date'],
+                                                 job.get('reviser') or string.capwords(getpass.getuser()),
+                                                 job.get('reviewer') or "Doris", output_dir=job.get('output_dir'), **options)
+        if options.get('profile'):
+            return {'status': 'OK', 'target': target_filename, 'profile': profiler.report(source=job.get('source'), target=target_filename)}
+        return {'status': 'OK', 'target': target_filename}
+    except Exception:
+        return {'status': 'FAILED', 'error': traceback.format_exc().strip().splitlines()[-1], 'log': log.getvalue()}
+
+# Path of the document a job will write, or None if its inputs can't tell (the build then fails on
+# its own). Only the CSVLOG header and 'CSV log comparison'!D2 of the source are read.
+def planned_target(job, history, versions):
+    try:
+        station_name = read_csvlog_header(job['csvlog'])[0]
+        if job.get('source'):
+            key = (os.path.abspath(job['source']), job['ver'], job['date'])
+            if key not in versions:
+                versions[key] = create_version_name(openpyxl.load_workbook(job['source'], read_only=True), job['ver'], job['date'])
+            version_name = versions[key]
+        else:
+            planned = history.plan(station_name, job['ver'], job['date']) if history else None
+            version_name = planned[0] if planned else None
+    except Exception:
+        return None
+    if not station_name or not version_name:
+        return None
+    return os.path.abspath(document_filename({'station_name': station_name, 'ovl_version_name': version_name}, job.get('output_dir')))
+
+# Jobs of a manifest that would overwrite the document of an earlier job, e.g. two units built
+# from the same previous version, are rejected before any of them is built
+def check_targets(jobs, history=None):
+    history = VersionHistory(history) if history else None
+    try:
+        targets = {}
+        versions = {} # The version name of every (template, ver, date) is read once
+        for i, job in enumerate(jobs):
+            target = planned_target(job, history, versions)
+            if target is None:
+                continue
+            if target in targets:
+                raise ValueError("Manifest rows {} and {} write the same document '{}'".format(targets[target] + 1, i + 1, target))
+            targets[target] = i
+    finally:
+        if history:
+            history.close()
+
+# Build every manifest row across a pool of worker processes, options are passed to build_verification
+def run_batch(manifest, workers=None, **options):
+    jobs = read_manifest(manifest, options.get('history'))
+    check_targets(jobs, options.get('history'))
+    print("\nRunning {} verification jobs from '{}'\n".format(len(jobs), manifest.split('/')[-1]))
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_batch_job, job, options): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            print("[Job {}/{}] {} {}".format(i + 1, len(jobs), results[i]['status'], results[i].get('target') or results[i]['error']))
+
+    # Print status summary for every job
+    print('\n---------------------------------------')
+    for i, (job, result) in enumerate(zip(jobs, results)):
+        print('{:>3}. {:<7} {}'.format(i + 1, result['status'], result.get('target') or "{}: {}".format(job['csvlog'].split('/')[-1], result['error'])))
+    failed = len([r for r in results if r['status'] != 'OK'])
+    print('---------------------------------------')
+    print('Succeeded: {}, Failed: {}\n'.format(len(results) - failed, failed))
+    return results
+
+
+# Worker mode: build jobs sent as JSON lines over a Unix socket, one job at a time, with the
+# parsed templates kept warm in template_cache between jobs
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                job = json.loads(line.decode('utf_8'))
+                if not isinstance(job, dict):
+                    raise ValueError("Job is not a JSON object: {}".format(line.decode('utf_8').strip()))
+                missing = [k for k in required_job_fields(self.server.options.get('history')) if not job.get(k)]
+                if missing:
+                    raise ValueError("Job is missing: {}".format(", ".join(missing)))
+                job['ver'] = str(job['ver'])
+                job['date'] = str(job['date'])
+                result = run_batch_job(job, dict(self.server.options, cache_template=True))
+            except ValueError as e:
+                result = {'status': 'FAILED', 'error': str(e)}
+            print("[Job] {} {}".format(result['status'], result.get('target') or result['error']))
+            self.wfile.write((json.dumps(result) + '\n').encode('utf_8'))
+
+def serve(socket_path, **options):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socketserver.UnixStreamServer(socket_path, JobHandler)
+    server.options = options
+    print("\nWaiting for verification jobs on '{}'\n".format(socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+# Send one job to a worker started with --serve and wait for its result
+def submit_job(socket_path, job):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(job) + '\n').encode('utf_8'))
+        reply = sock.makefile('rb').readline()
+    if not reply:
+        raise ConnectionError("Worker on '{}' closed the connection without a result".format(socket_path))
+    return json.loads(reply.decode('utf_8'))
+
+
+# Watch mode: poll the CSVLOG, MODEM and CSV folders under one directory and build a document as
+# soon as all three files of a unit have landed. A file is used once its size and mtime did not
+# change for `debounce` seconds. MODEM and CSV files are paired with a CSVLOG by the serial number
+# in their file name, and at most one build per station runs at a time. Files may be compressed,
+# e.g. 'C02X.txt.gz' in MODEM.
+watch_folders = {'csvlog': ('CSVLOG', '.csv'), 'modem': ('MODEM', '.txt'), 'csv': ('CSV', '.csv')}
+
+# Station name and serial number from the first row of a CSVLOG file, as in Step 0
+def read_csvlog_header(path):
+    with open_input(path, newline='', encoding='utf_8') as f:
+        row = next(csv.reader(f), [])
+    station_name = row[0] if len(row) > 0 else None
+    serial_num = row[2].strip('Serial Number:') if len(row) > 2 else None
+    return station_name, serial_num
+
+# True if the serial number is a whole token of the file name, e.g. 'C02X1' matches 'C02X1.txt' and
+# 'modem_C02X1-2.txt' but not 'C02X12.txt'
+def has_serial_num(path, serial_num):
+    return re.search(r'(?<![0-9A-Za-z]){}(?![0-9A-Za-z])'.format(re.escape(serial_num)), os.path.basename(path)) is not None
+
+# (path, state) of files by the alphanumeric tokens of their names, so the files of a serial number
+# are one lookup instead of a has_serial_num() over the whole folder
+def serial_index(files):
+    index = {None: files}
+    for path, state in files:
+        for token in set(re.findall(r'[0-9A-Za-z]+', os.path.basename(path))):
+            index.setdefault(token, []).append((path, state))
+    return index
+
+def serial_files(index, serial_num):
+    if re.match(r'[0-9A-Za-z]+$', serial_num):
+        return index.get(serial_num, [])
+    return [(p, s) for p, s in index[None] if has_serial_num(p, serial_num)]
+
+# Watch mode builds in worker processes that ignore Ctrl-C, so an interrupt doesn't kill a build
+# in the middle of saving. The watcher lets the running builds finish instead.
+def ignore_sigint():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def watch_pool(workers=None):
+    return ProcessPoolExecutor(max_workers=workers, initializer=ignore_sigint)
+
+# With a folder of verification documents as source, the newest document of the station is used
+def find_station_source(source, station_name):
+    if not os.path.isdir(source):
+        return source
+    prefix = "QTVerification_{}_".format(station_name)
+    documents = [os.path.join(source, name) for name in os.listdir(source) if name.startswith(prefix) and name.endswith('.xlsx')]
+    return max(documents, key=os.path.getmtime) if documents else None
+
+class FolderWatcher(object):
+    def __init__(self, root, source, testplan_ver, ovl_verify_date=None, reviser_name=None, reviewer_name=None, debounce=2.0):
+        self.root = root
+        self.source = os.path.abspath(source)
+        self.testplan_ver = testplan_ver
+        self.ovl_verify_date = ovl_verify_date
+        self.reviser_name = reviser_name
+        self.reviewer_name = reviewer_name
+        self.debounce = debounce
+        self.started = time.time() # CSVLOG files older than this are left alone
+        self.seen = {} # folder key -> {path: ((size, mtime), time the state was first seen)} of the last scan
+        self.headers = {} # (path, (size, mtime)) -> (station name, serial number) of CSVLOG files not queued yet
+        self.done = set() # (path, (size, mtime)) of CSVLOG files already queued
+        self.busy = set() # stations with a running build
+
+    # Files of one folder whose size and mtime did not change for `debounce` seconds. Files that
+    # are gone since the last scan are forgotten.
+    def stable_files(self, key, now):
+        folder, extension = watch_folders[key]
+        folder = os.path.join(self.root, folder)
+        seen, self.seen[key] = self.seen.get(key, {}), {}
+        if not os.path.isdir(folder):
+            return []
+        stable = []
+        for entry in os.scandir(folder):
+            name = entry.name.lower()
+            if name.endswith(compressed_suffixes):
+                name = os.path.splitext(name)[0]
+            if not entry.is_file() or not name.endswith(extension):
+                continue
+            stat = entry.stat()
+            state = (stat.st_size, stat.st_mtime)
+            previous = seen.get(entry.path)
+            if previous is None or previous[0] != state:
+                previous = (state, now)
+            elif now - previous[1] >= self.debounce:
+                stable.append((entry.path, state))
+            self.seen[key][entry.path] = previous
+        return stable
+
+    # Forget the CSVLOG files that are gone or changed since they were queued or read
+    def prune(self):
+        current = lambda key: self.seen['csvlog'].get(key[0], (None,))[0] == key[1]
+        self.done = set(filter(current, self.done))
+        self.headers = {key: header for key, header in self.headers.items() if current(key)}
+
+    # Jobs for every new CSVLOG file that has its MODEM and CSV files
+    def ready_jobs(self, now):
+        modems = serial_index(self.stable_files('modem', now))
+        csvs = serial_index(self.stable_files('csv', now))
+        csvlogs = self.stable_files('csvlog', now)
+        self.prune()
+        jobs = []
+        for path, state in csvlogs:
+            key = (path, state)
+            if key in self.done or state[1] < self.started:
+                continue
+            if key not in self.headers:
+                try:
+                    self.headers[key] = read_csvlog_header(path)
+                except (OSError, UnicodeDecodeError, csv.Error) as e:
+                    print("[Watch] Skipping '{}': {}".format(path.split('/')[-1], e))
+                    self.done.add(key)
+                    continue
+            station_name, serial_num = self.headers[key]
+            if not station_name or not serial_num or station_name in self.busy:
+                continue
+
+            # The MODEM and CSV files closest in time to the CSVLOG file
+            matches = [serial_files(index, serial_num) for index in (modems, csvs)]
+            if not all(matches):
+                continue
+            modem, csv_file = [min(files, key=lambda f: abs(f[1][1] - state[1]))[0] for files in matches]
+
+            self.done.add(key)
+            del self.headers[key]
+            source = find_station_source(self.source, station_name)
+            if source is None:
+                print("[Watch] Skipping '{}': no verification document of station {} in '{}'".format(path.split('/')[-1], station_name, self.source))
+                continue
+            self.busy.add(station_name)
+            jobs.append({'source': source, 'csvlog': path, 'modem': modem, 'csv': csv_file, 'ver': self.testplan_ver,
+                         'date': self.ovl_verify_date or datetime.strftime(date.today(), "%Y%m%d"),
+                         'reviser': self.reviser_name, 'reviewer': self.reviewer_name, 'station': station_name,
+                         'output_dir': self.source if os.path.isdir(self.source) else os.getcwd()})
+        return jobs
+
+    def finished(self, job, result):
+        self.busy.discard(job['station'])
+        print("[Watch] {} {}".format(result['status'], result.get('target') or "{}: {}".format(job['csvlog'].split('/')[-1], result['error'])))
+
+    # Poll the folders until interrupted, the pool runs at most `workers` builds at once. On Ctrl-C
+    # the builds that haven't started are cancelled and the running ones finish.
+    def run(self, workers=None, interval=1.0, **options):
+        print("\nWatching '{}' for new CSVLOG, MODEM and CSV files\n".format(self.root))
+        running = {}
+        with watch_pool(workers) as pool:
+            try:
+                while True:
+                    for future in [f for f in running if f.done()]:
+                        self.finished(running.pop(future), future.result())
+                    for job in self.ready_jobs(time.time()):
+                        print("[Watch] Queued {} {}".format(job['station'], job['csvlog'].split('/')[-1]))
+                        running[pool.submit(run_batch_job, job, options)] = job
+                    time.sleep(interval)
+            except KeyboardInterrupt:
+                cancelled = [f for f in running if f.cancel()]
+                print("\nWaiting for {} running builds, {} queued builds are cancelled\n".format(len(running) - len(cancelled), len(cancelled)))
+                for future in as_completed([f for f in running if not f.cancelled()]):
+                    self.finished(running[future], future.result())
+
+
+def write_profile(filename, report):
+    with open(filename, 'w', encoding='utf_8') as f:
+        json.dump(report, f, indent=2)
+    print("Profile report is written to '{}'\n".format(filename))
+
+
+def main(argv=None):
+    # Set up arguments for this program
+    parser = argparse.ArgumentParser(description="Auto Verification program!", formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-r", "--reviser", default=string.capwords(getpass.getuser()), help="who release this verification document")
+    parser.add_argument("-w", "--reviewer", default="Doris", help="the reviewer name, default name is Doris")
+    parser.add_argument("-s", "--source", help="path of source .xlsx verification document")
+    parser.add_argument("-l", "--csvlog", help="path of .csv file in CSVLOG folder, may be .gz or .zst compressed")
+    parser.add_argument("-m", "--modem", help="path of .txt file in MODEM folder, may be .gz or .zst compressed")
+    parser.add_argument("-c", "--csv", help="path of .csv file in CSV folder, may be .gz or .zst compressed")
+    parser.add_argument("-v", "--ver", help="version number of the new test plan")
+    parser.add_argument("-d", "--date", help="overlay verified date, format: 20170509")
+    parser.add_argument("-b", "--batch", help="path of .csv/.json manifest, one job per row with columns:\nsource, csvlog, modem, csv, ver, date, reviser (optional), reviewer (optional)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes in batch and watch mode, default is CPU count")
+    parser.add_argument("--serve", metavar="SOCKET", help="run as a worker that builds jobs sent to this Unix socket,\nparsed templates are cached between jobs")
+    parser.add_argument("--connect", metavar="SOCKET", help="send this job to a worker started with --serve")
+    parser.add_argument("--profile", metavar="JSON", help="write wall time, CPU time, peak memory and counters of every step to a .json file\n(a list with one report per job in batch mode)")
+    parser.add_argument("--watch", metavar="DIR", help="watch the CSVLOG, MODEM and CSV folders in DIR and build a document for every\nnew CSVLOG file once its MODEM and CSV files (named with its serial number) are there,\n--source may be a folder of verification documents, the newest one of the station is used")
+    parser.add_argument("--debounce", type=float, default=2.0, help="seconds a watched file must stay unchanged before it is used, default is 2")
+    parser.add_argument("--patch-xlsx", action="store_true", help="load only the sheets the steps edit and save by patching the source .xlsx,\nits other sheets, drawings and media are copied byte-for-byte")
+    parser.add_argument("--cache", metavar="DIR", help="keep the last document built from every template in DIR, a rebuild\nonly redoes the steps whose inputs (content hashes) changed")
+    parser.add_argument("--stream-csv", action="store_true", help="stream the 'CSV file' sheet into the saved document,\nmemory use does not grow with the size of the csv file")
+    parser.add_argument("--dry-run", "--validate", dest="dry_run", action="store_true", help="only check the arguments and input files (also of every manifest row),\nprint the documents that would be created and exit")
+    parser.add_argument("--compress-level", type=int, choices=range(10), metavar="0-9", help="deflate level of the saved document, 0 stores it uncompressed (fast drafts),\nthe parts are compressed in parallel on all cores")
+    parser.add_argument("--atomic-save", action="store_true", help="save to a temporary file and rename it into place once it is complete")
+    parser.add_argument("--summary", choices=summary_formats, help="also write the station, serial number, diags version, test time, new version,\ndates and rows of every sheet to a .json or .csv file next to the document")
+    parser.add_argument("--dump-csvlog", action="store_true", help="also write the typed CSV log columns to a .csvlog.json file next to the document")
+    parser.add_argument("--history", metavar="DB", help="record every built document in this SQLite version history, with it --source\n(also in a manifest) may be left out to build from the station's latest document")
+    parser.add_argument("--compare", action="store_true", help="highlight the CSV log values that moved since the previous CSV log and\nwrite a summary next to the 'CSV log comparison' sheet (needs numpy)")
+    parser.add_argument("--aggregate", nargs="+", metavar="CSVLOG", help="CSVLOG files of more units of the same station and version, the test values of\nall units with their min, max, mean, std dev and outliers go to a 'CSV log units' sheet\n(needs numpy)")
+    parser.add_argument("--outlier-z", type=float, default=3.5, help="modified z-score above which a value of --aggregate is an outlier, default is 3.5")
+    parser.add_argument("--abs-tol", type=float, default=0.0, help="absolute tolerance of --compare, default is 0")
+    parser.add_argument("--rel-tol", type=float, default=0.05, help="relative tolerance of --compare, default is 0.05 (5%%)")
+
+    # Combine all arguments into a list called args
+    args = parser.parse_args(argv)
+
+    build_cache = os.path.abspath(args.cache) if args.cache else None
+    compare = (args.abs_tol, args.rel_tol) if args.compare else None
+    history = os.path.abspath(args.history) if args.history else None
+    aggregate = ([os.path.abspath(path) for path in args.aggregate], args.outlier_z) if args.aggregate else None
+    # Build options of every mode, profile reports are only written in batch and single mode
+    options = dict(build_options, stream_csv=args.stream_csv, build_cache=build_cache, patch_xlsx=args.patch_xlsx, compare=compare,
+                   compress_level=args.compress_level, atomic_save=args.atomic_save, summary=args.summary,
+                   dump_csvlog=args.dump_csvlog, history=history, aggregate=aggregate)
+    if args.serve:
+        serve(args.serve, **options)
+        return 0
+
+    if args.batch and args.dry_run:
+        return 0 if dry_run(read_manifest(args.batch, history), history) else 1
+
+    if args.batch:
+        results = run_batch(args.batch, args.workers, **dict(options, profile=bool(args.profile)))
+        if args.profile:
+            write_profile(args.profile, [r['profile'] for r in results if 'profile' in r])
+        return 1 if [r for r in results if r['status'] != 'OK'] else 0
+
+    if args.watch:
+        missing = ["--" + k for k in ['source', 'ver'] if getattr(args, k) is None]
+        if missing:
+            parser.error("the following arguments are required: {}".format(", ".join(missing)))
+        watcher = FolderWatcher(args.watch, args.source, args.ver, args.date, args.reviser, args.reviewer, args.debounce)
+        watcher.run(args.workers, **options)
+        return 0
+
+    # A job sent with --connect may leave out --source, the worker decides with its own version history
+    missing = ["--" + k for k in required_job_fields(history) if getattr(args, k) is None and not (args.connect and k == 'source')]
+    if missing:
+        parser.error("the following arguments are required: {}".format(", ".join(missing)))
+
+    if args.dry_run:
+        job = {k: getattr(args, k) for k in ['source', 'csvlog', 'modem', 'csv', 'ver', 'date']}
+        return 0 if dry_run([job], history) else 1
+
+    if args.connect:
+        job = {k: os.path.abspath(getattr(args, k)) for k in ['source', 'csvlog', 'modem', 'csv'] if getattr(args, k)}
+        job.update({'ver': args.ver, 'date': args.date, 'reviser': args.reviser, 'reviewer': args.reviewer, 'output_dir': os.getcwd()})
+        result = submit_job(args.connect, job)
+        if result['status'] != 'OK':
+            print("Verification job failed: {}\n".format(result['error']))
+            return 1
+        print("Verification document '{}' is successfully created!\n".format(result['target']))
+        return 0
+
+    target_filename = build_verification(args.source, args.csvlog, args.modem, args.csv, args.ver, args.date, args.reviser, args.reviewer,
+                                         **dict(options, profile=bool(args.profile)))
+    if args.profile:
+        write_profile(args.profile, profiler.report(source=args.source, target=target_filename))
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+# Microbenchmark: modem log cell sanitizer of Step 4
+# -----------------------------------------------------------------------------------------------
+# Compares the old per-character printable filter with the translate-table sanitizer in avt.py,
+# and checks both give identical cell values on a synthetic UART capture.
+# -----------------------------------------------------------------------------------------------
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import avt
+
+# Old Step 4 path, one lambda call per character
+def filter_modem_line(line):
+    row = line.split('\t')
+    cells = []
+    for j in range(len(row)):
+        filtered_string = "".join(filter(lambda x: x in string.printable, row[j]))
+        if "==" in filtered_string:
+            filtered_string = " " + filtered_string
+        cells.append(filtered_string)
+    return cells
+
+# Synthetic UART lines with control characters, non-ASCII noise and "==" separators
+def make_lines(count, seed=0):
+    rnd = random.Random(seed)
+    noise = '\x00\x01\x07\x1b\x7fé☃�'
+    lines = []
+    for i in range(count):
+        fields = []
+        for j in range(rnd.randint(1, 6)):
+            text = ''.join(rnd.choice(string.printable[:94]) for k in range(rnd.randint(0, 60)))
+            if rnd.random() < 0.3:
+                pos = rnd.randint(0, len(text))
+                text = text[:pos] + rnd.choice(noise) + text[pos:]
+            if rnd.random() < 0.1:
+                text = '==' + text
+            fields.append(text)
+        lines.append('\t'.join(fields) + '\n')
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Step 4 modem log sanitizer")
+    parser.add_argument("-n", "--lines", type=int, default=100000, help="number of synthetic log lines, default is 100000")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="best of N runs, default is 3")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    size = sum(len(line) for line in lines)
+
+    # Both paths must produce the same cell values
+    for line in lines:
+        assert filter_modem_line(line) == avt.split_modem_line(line), repr(line)
+
+    print("{} lines, {:.1f} MB".format(len(lines), size / 1e6))
+    results = []
+    for name, func in [('printable filter', filter_modem_line), ('translate table', avt.split_modem_line)]:
+        best = min(timeit.repeat(lambda: [func(line) for line in lines], number=1, repeat=args.repeat))
+        results.append(best)
+        print("{:<17} {:8.3f} s  {:8.1f} MB/s".format(name, best, size / 1e6 / best))
+    print("speedup           {:8.1f}x".format(results[0] / results[1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Benchmark: every step of avt.py on synthetic inputs of increasing size
+# -----------------------------------------------------------------------------------------------
+# Generates a template workbook with the five sheets avt.py edits, plus CSVLOG, modem and CSV
+# inputs with the given number of rows. Then it runs build_verification in a fresh process for
+# each size and reports time, throughput and peak RSS of every step. Runs fully offline.
+# -----------------------------------------------------------------------------------------------
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import avt
+from synthetic import make_csv, make_csvlog, make_modem, make_template
+
+station_name = 'BENCH'
+
+# Build one document in this (fresh) process and return its profile report
+def run_size(rows, workdir, stream_csv):
+    paths = {name: os.path.join(workdir, name) for name in ('template.xlsx', 'csvlog.csv', 'modem.txt', 'raw.csv')}
+    make_template(paths['template.xlsx'], rows, station_name)
+    make_csvlog(paths['csvlog.csv'], rows, rows, station_name, 'C02BENCH0001')
+    make_modem(paths['modem.txt'], rows, rows)
+    make_csv(paths['raw.csv'], rows, rows)
+
+    os.chdir(workdir)
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            target = avt.build_verification(paths['template.xlsx'], paths['csvlog.csv'], paths['modem.txt'], paths['raw.csv'],
+                                            '12', '20170509', 'Bench', stream_csv=stream_csv, profile=True)
+        finally:
+            sys.stdout = stdout
+    return avt.profiler.report(rows=rows, output_bytes=os.path.getsize(target))
+
+def print_report(report):
+    rows = report['rows']
+    print("\n{} rows, output {:.1f} MB".format(rows, report['output_bytes'] / 1e6))
+    print("{:<28} {:>9} {:>9} {:>12} {:>12} {:>10}".format('stage', 'wall s', 'cpu s', 'rows/s', 'cells/s', 'rss MB'))
+    for stage in report['stages']:
+        wall = max(stage['wall_time'], 1e-9)
+        print("{:<28} {:>9.3f} {:>9.3f} {:>12.0f} {:>12.0f} {:>10.1f}".format(
+            stage['name'], stage['wall_time'], stage['cpu_time'], rows / wall,
+            stage.get('cells_written', 0) / wall, stage.get('max_rss_kb', 0) / 1024.0))
+    totals = report['totals']
+    print("{:<28} {:>9.3f} {:>9.3f} {:>12.0f} {:>12.0f} {:>10.1f}".format(
+        'total', totals['wall_time'], totals['cpu_time'], rows / max(totals['wall_time'], 1e-9),
+        totals.get('cells_written', 0) / max(totals['wall_time'], 1e-9), totals.get('max_rss_kb', 0) / 1024.0))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every step of avt.py on synthetic inputs", formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-n", "--sizes", default="100,1000,10000", help="comma separated row counts, default is 100,1000,10000\n(add 100000,1000000 for the full run)")
+    parser.add_argument("--stream-csv", action="store_true", help="build with --stream-csv")
+    parser.add_argument("--json", help="also write the reports to a .json file")
+    args = parser.parse_args()
+
+    reports = []
+    for rows in [int(size) for size in args.sizes.split(',')]:
+        # A fresh process per size, so peak RSS is not carried over from the previous size
+        with tempfile.TemporaryDirectory() as workdir, \
+             ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            report = pool.submit(run_size, rows, workdir, args.stream_csv).result()
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf_8') as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == '__main__':
+    main()
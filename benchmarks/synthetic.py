@@ -0,0 +1,85 @@
+# Synthetic inputs of avt.py: a template workbook with the five sheets the steps edit, plus CSVLOG,
+# modem and CSV files with the given number of rows. Used by the benchmarks and by tests/.
+# Every file of the same rows and seed is the same.
+import csv
+import os
+import random
+import sys
+
+import openpyxl
+from openpyxl.styles import PatternFill
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import avt
+
+previous_version = 'JH20170401ver11_TPA_004'
+
+# Template with the 'Version ', 'Program Verification', 'CSV log comparison', 'UART Log Check'
+# and 'CSV file' sheets, the comparison sheets hold a previous log of `rows` rows, the 'CSV log
+# comparison' one on a gray background
+def make_template(path, rows=30, station_name='FCT'):
+    gray = PatternFill(fill_type="solid", start_color='FF' + avt.gray_color_string, end_color='FF' + avt.gray_color_string)
+    workbook = openpyxl.Workbook()
+
+    worksheet = workbook.active
+    worksheet.title = 'Version '
+    worksheet['B3'] = previous_version
+
+    worksheet = workbook.create_sheet('Program Verification')
+    for c, header in enumerate(['Date', 'Station', '', '', 'Fail Symptom', 'Program Version', '', 'Test Time'], start=2):
+        worksheet.cell(row = 2, column = c).value = header
+    for r in range(3, 8):
+        worksheet.cell(row = r, column = 2).value = '2017/04/{:02d}'.format(r)
+        worksheet.cell(row = r, column = 3).value = station_name
+        worksheet.cell(row = r, column = 9).value = 100.0 + r
+
+    worksheet = workbook.create_sheet('CSV log comparison')
+    worksheet['D2'] = '{} VERSION: {}'.format(station_name, previous_version)
+    worksheet['D3'] = 'CSV LOG'
+    for r in range(rows):
+        worksheet.cell(row = r+4, column = 4).value = 'test{}'.format(r)
+        for c in range(5, 10):
+            worksheet.cell(row = r+4, column = c).value = r * c
+    worksheet.cell(row = rows+4, column = 4).value = 'Total Test Time'
+    worksheet.cell(row = rows+4, column = 5).value = 123.4
+    for r in range(1, rows + 7):
+        for c in range(1, 18):
+            worksheet.cell(row = r, column = c).fill = gray
+
+    worksheet = workbook.create_sheet('UART Log Check')
+    worksheet['D2'] = '{} VERSION: {}'.format(station_name, previous_version)
+    worksheet['D3'] = 'UART Log'
+    worksheet['H3'] = 'UART Log'
+    for r in range(rows):
+        for c in range(4, 7):
+            worksheet.cell(row = r+4, column = c).value = 'uart {} {}'.format(r, c)
+    worksheet.cell(row = 1, column = 11).fill = gray # Right margin of the sheet
+
+    worksheet = workbook.create_sheet('CSV file')
+    worksheet['A1'] = 'previous'
+    workbook.save(path)
+
+def make_csvlog(path, rows=30, seed=0, station_name='FCT', serial_num='C02TEST0001'):
+    rnd = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf_8') as f:
+        writer = csv.writer(f)
+        writer.writerow([station_name, 'SW_Version:' + previous_version, 'Serial Number:' + serial_num, '', '', ''])
+        writer.writerow(['DIAGS_VERSION', '', '', 'D1.2.3', '', ''])
+        for r in range(rows):
+            writer.writerow(['test{}'.format(r), 'PASS', '{:.4f}'.format(rnd.random()), str(r), 'nan', 'mV'])
+        writer.writerow(['Total Test Time', '321.5', '', '', '', ''])
+
+# Lines of 1-4 tab separated fields, with a control character the steps have to drop
+def make_modem(path, rows=20, seed=0):
+    rnd = random.Random(seed)
+    with open(path, 'w', encoding='utf_8') as f:
+        for r in range(rows):
+            fields = ['[{:08d}] uart'.format(r)] + ['reg{}=0x{:04X}\x07'.format(c, rnd.randrange(65536)) for c in range(rnd.randint(0, 3))]
+            f.write('\t'.join(fields) + '\n')
+
+def make_csv(path, rows=20, seed=0):
+    rnd = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf_8') as f:
+        writer = csv.writer(f)
+        for r in range(rows):
+            writer.writerow(['item{}'.format(r), str(r), '{:.3f}'.format(rnd.random()), 'PASS'])
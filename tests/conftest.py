@@ -0,0 +1,28 @@
+# Small template workbook and inputs for building verification documents in tests, the files are
+# made by the factories of benchmarks/synthetic.py
+import os
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+import avt
+from synthetic import make_csv, make_csvlog, make_modem, make_template
+
+# Paths of a template and one unit's inputs in a temporary folder
+@pytest.fixture
+def inputs(tmp_path):
+    paths = {'source': str(tmp_path / 't.xlsx'), 'csvlog': str(tmp_path / 'log.csv'),
+             'modem': str(tmp_path / 'modem.txt'), 'csv': str(tmp_path / 'raw.csv')}
+    make_template(paths['source'])
+    make_csvlog(paths['csvlog'])
+    make_modem(paths['modem'])
+    make_csv(paths['csv'])
+    return paths
+
+# Build a document from source into output_dir (the folder of the inputs by default), and return its path
+def build(inputs, source=None, ver='12', date='20170509', output_dir=None, **options):
+    return avt.build_verification(source or inputs['source'], inputs['csvlog'], inputs['modem'], inputs['csv'], ver, date,
+                                  'Tester', 'Doris', output_dir=output_dir or os.path.dirname(inputs['source']), **options)
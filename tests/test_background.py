@@ -0,0 +1,44 @@
+import openpyxl
+
+import avt
+from conftest import build
+
+# Coordinates covered by the background conditional format of a sheet
+def background(worksheet):
+    ranges = [r for r, rules in worksheet.conditional_formatting.cf_rules.items() if any(avt.is_background_rule(rule) for rule in rules)]
+    assert len(ranges) == 1
+    return {(r, c) for cell_range in ranges[0].split() for r, c in cells_of(cell_range)}
+
+def cells_of(cell_range):
+    min_col, min_row, max_col, max_row = avt.range_boundaries(cell_range)
+    return [(r, c) for r in range(min_row, max_row + 1) for c in range(min_col, max_col + 1)]
+
+def test_background_is_a_conditional_format(inputs):
+    workbook = openpyxl.load_workbook(build(inputs))
+    for title in ['CSV log comparison', 'UART Log Check']:
+        worksheet = workbook.get_sheet_by_name(title)
+        assert not background(worksheet) & set(worksheet._cells) # No cell is saved for the background
+
+    # The margins around and between the two logs are painted, the logs themselves are not
+    covered = background(workbook.get_sheet_by_name('CSV log comparison'))
+    assert {(4, 1), (33, 3), (4, 10), (33, 10), (4, 17), (37, 1)} <= covered
+    assert not {(4, 4), (33, 9), (4, 11), (33, 16)} & covered
+    covered = background(workbook.get_sheet_by_name('UART Log Check'))
+    assert {(1, 11), (25, 4), (35, 1)} <= covered
+    assert not {(4, 4), (24, 6)} & covered
+
+def test_background_cells_are_created_when_used(inputs):
+    worksheet = openpyxl.Workbook().active
+    worksheet['B2'] = 'kept'
+    avt.paint_background(worksheet, 'A1:C3')
+    assert len(dict.keys(worksheet._cells)) == 1 # Only the cell with a value exists
+    assert worksheet.max_row == 3 and worksheet.max_column == 3
+    assert worksheet['B2'].fill.start_color.rgb == 'FF' + avt.gray_color_string
+
+    # A cell of the background is created with its fill on first access, the rest stays a range
+    worksheet['C3'].value = 'new'
+    assert worksheet['C3'].fill.start_color.rgb == 'FF' + avt.gray_color_string
+    avt.compact_background(worksheet)
+    assert type(worksheet._cells) is dict
+    assert sorted(worksheet._cells) == [(2, 2), (3, 3)]
+    assert list(worksheet.conditional_formatting.cf_rules) == ['A1:C1 A2:A2 C2:C2 A3:B3']
@@ -0,0 +1,31 @@
+import csv
+import os
+
+import pytest
+
+import avt
+from conftest import make_csvlog
+
+def write_manifest(path, jobs):
+    with open(path, 'w', newline='', encoding='utf_8') as f:
+        writer = csv.DictWriter(f, ['source', 'csvlog', 'modem', 'csv', 'ver', 'date'])
+        writer.writeheader()
+        writer.writerows(jobs)
+
+def test_batch_rejects_jobs_writing_the_same_document(inputs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_csvlog(str(tmp_path / 'log2.csv'), serial_num='C02TEST0002', seed=1)
+    job = {'source': 't.xlsx', 'csvlog': 'log.csv', 'modem': 'modem.txt', 'csv': 'raw.csv', 'ver': '12', 'date': '20170509'}
+    # Two units built from the same previous version get the same version name
+    write_manifest(str(tmp_path / 'm.csv'), [job, dict(job, ver='13'), dict(job, csvlog='log2.csv')])
+    with pytest.raises(ValueError, match="rows 1 and 3 write the same document"):
+        avt.run_batch(str(tmp_path / 'm.csv'), 1)
+    assert not [name for name in os.listdir(str(tmp_path)) if name.startswith('QTVerification')]
+
+def test_batch_builds_distinct_documents(inputs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    job = {'source': 't.xlsx', 'csvlog': 'log.csv', 'modem': 'modem.txt', 'csv': 'raw.csv', 'ver': '12', 'date': '20170509'}
+    write_manifest(str(tmp_path / 'm.csv'), [job, dict(job, ver='13')])
+    results = avt.run_batch(str(tmp_path / 'm.csv'), 1)
+    assert [os.path.basename(r['target']) for r in results] == ['QTVerification_FCT_JH20170509ver12_TPA_005.xlsx',
+                                                                 'QTVerification_FCT_JH20170509ver13_TPA_005.xlsx']
@@ -0,0 +1,105 @@
+import re
+import shutil
+
+import openpyxl
+import pytest
+
+import avt
+from conftest import build, make_csv, make_csvlog, make_modem
+
+steps = list(avt.step_dependencies)
+naming_steps = ['step 1 version', 'step 2 program verification', 'step 3 csv log comparison',
+                'step 3b csv log units', 'step 4 uart log check'] # Steps that write the version name
+
+# Values, fills, borders and fonts of every cell, and the conditional formats of every sheet
+def document_dump(path):
+    workbook = openpyxl.load_workbook(path)
+    dump = {}
+    for worksheet in workbook.worksheets:
+        cells = {}
+        for (r, c), cell in worksheet._cells.items():
+            cells[(r, c)] = (cell.value, cell.fill.fgColor.rgb if cell.fill.fill_type else None,
+                             tuple(side.style for side in [cell.border.left, cell.border.right, cell.border.top, cell.border.bottom]),
+                             (cell.font.b, cell.font.sz, cell.font.name, cell.font.color.rgb if cell.font.color else None))
+        rules = sorted((r, rule.formula[0], rule.dxf.fill.fgColor.rgb) for r, rs in worksheet.conditional_formatting.cf_rules.items() for rule in rs)
+        dump[worksheet.title] = (cells, rules, sorted(worksheet.merged_cell_ranges))
+    return dump
+
+# Build the unit once with a build cache, then change one input or option of the next build
+@pytest.mark.parametrize('change, redone', [
+    ('nothing', []),
+    ('modem', ['step 4 uart log check']),
+    ('csvlog', ['step 3 csv log comparison']), # Step 3b only reads it with --aggregate
+    ('csv', ['step 5 csv file']),
+    ('ver', naming_steps),
+    ('date', naming_steps),
+    ('compare', ['step 3 csv log comparison']),
+    ('aggregate', ['step 3b csv log units']),
+    ('stream_csv', ['step 5 csv file']),
+    ('patch_xlsx', steps), # The entry was built from all sheets of the template
+])
+def test_build_cache_redoes_the_steps_of_the_change(inputs, tmp_path, capsys, change, redone):
+    if change in ('compare', 'aggregate') and avt.numpy is None:
+        pytest.skip("--{} needs numpy".format(change))
+    cache = str(tmp_path / 'cache')
+    (tmp_path / 'cached').mkdir()
+    (tmp_path / 'full').mkdir()
+    build(inputs, build_cache=cache, output_dir=str(tmp_path / 'cached'))
+    capsys.readouterr()
+
+    args = {'ver': '12', 'date': '20170509'}
+    options = {}
+    if change == 'modem':
+        make_modem(inputs['modem'], rows=25, seed=1)
+    elif change == 'csvlog':
+        make_csvlog(inputs['csvlog'], seed=1)
+    elif change == 'csv':
+        make_csv(inputs['csv'], seed=1)
+    elif change == 'ver':
+        args['ver'] = '13'
+    elif change == 'date':
+        args['date'] = '20170510'
+    elif change == 'compare':
+        options['compare'] = (0.0, 0.05)
+    elif change == 'aggregate':
+        make_csvlog(str(tmp_path / 'unit2.csv'), seed=2, serial_num='C02TEST0002')
+        options['aggregate'] = ([str(tmp_path / 'unit2.csv')], 3.5)
+    elif change != 'nothing':
+        options[change] = True
+
+    cached = build(inputs, build_cache=cache, output_dir=str(tmp_path / 'cached'), **dict(args, **options))
+    reused = re.findall(r"Reusing (.*) from the build cache", capsys.readouterr().out)
+    assert [step for step in steps if step not in reused] == redone
+
+    full = build(inputs, output_dir=str(tmp_path / 'full'), **dict(args, **options))
+    assert document_dump(cached) == document_dump(full)
+
+# A rebuild of a rebuild still starts from the last document of the template
+def test_build_cache_chain(inputs, tmp_path):
+    cache = str(tmp_path / 'cache')
+    (tmp_path / 'full').mkdir()
+    build(inputs, build_cache=cache)
+    make_modem(inputs['modem'], rows=25, seed=1)
+    build(inputs, build_cache=cache)
+    make_csv(inputs['csv'], seed=2)
+    cached = build(inputs, build_cache=cache, ver='13')
+    full = build(inputs, output_dir=str(tmp_path / 'full'), ver='13')
+    assert document_dump(cached) == document_dump(full)
+
+# With --aggregate, Step 3b depends on the CSVLOG of this unit and on the ones of the other units
+@pytest.mark.skipif(avt.numpy is None, reason="--aggregate needs numpy")
+@pytest.mark.parametrize('unit', ['this', 'other'])
+def test_build_cache_aggregate_units(inputs, tmp_path, capsys, unit):
+    cache = str(tmp_path / 'cache')
+    (tmp_path / 'full').mkdir()
+    other = str(tmp_path / 'unit2.csv')
+    make_csvlog(other, seed=2, serial_num='C02TEST0002')
+    build(inputs, build_cache=cache, aggregate=([other], 3.5))
+    capsys.readouterr()
+
+    make_csvlog(inputs['csvlog'] if unit == 'this' else other, seed=3)
+    cached = build(inputs, build_cache=cache, aggregate=([other], 3.5))
+    reused = re.findall(r"Reusing (.*) from the build cache", capsys.readouterr().out)
+    redone = [step for step in steps if step not in reused]
+    assert redone == (['step 3 csv log comparison', 'step 3b csv log units'] if unit == 'this' else ['step 3b csv log units'])
+    assert document_dump(cached) == document_dump(build(inputs, output_dir=str(tmp_path / 'full'), aggregate=([other], 3.5)))
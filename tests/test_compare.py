@@ -0,0 +1,38 @@
+import openpyxl
+import pytest
+
+import avt
+from conftest import build
+
+pytestmark = pytest.mark.skipif(avt.numpy is None, reason="--compare needs numpy")
+
+def summary_block(path):
+    worksheet = openpyxl.load_workbook(path).get_sheet_by_name('CSV log comparison')
+    return worksheet, {worksheet.cell(row = r, column = 19).value: worksheet.cell(row = r, column = 20).value for r in range(2, 12)}
+
+def test_compare_summary(inputs):
+    worksheet, summary = summary_block(build(inputs, compare=(0.0, 0.05)))
+    # test0-29 and the total test time pair up, the station and DIAGS_VERSION rows are new
+    assert summary['Compared tests'] == 31
+    assert summary['Changed tests'] == 31
+    assert summary['New tests'] == 2
+    assert summary['Removed tests'] == 0
+    assert summary['Total test time'] == 321.5
+    assert summary['Previous total test time'] == 123.4
+    assert summary['Total test time delta'] == pytest.approx(198.1)
+    assert worksheet['T11'].fill.start_color.rgb == 'FF' + avt.red_color_string
+
+def test_compare_unchanged_log_clears_delta_fill(inputs):
+    first = build(inputs, compare=(0.0, 0.05))
+    worksheet, summary = summary_block(build(inputs, source=first, ver='13', compare=(0.0, 0.05)))
+    assert summary['Compared tests'] == 33
+    assert summary['Changed tests'] == 0
+    assert summary['Total test time delta'] == 0
+    assert worksheet['T11'].fill.start_color.rgb != 'FF' + avt.red_color_string
+
+def test_build_without_compare_drops_summary(inputs):
+    first = build(inputs, compare=(0.0, 0.05))
+    worksheet, summary = summary_block(build(inputs, source=first, ver='13'))
+    assert set(summary) == {None}
+    assert [(cell.coordinate, cell.fill.start_color.rgb) for row in worksheet['S2:T11'] for cell in row
+            if cell.fill.start_color.rgb == 'FF' + avt.red_color_string] == []
@@ -0,0 +1,18 @@
+import pytest
+
+import avt
+
+EDGE_VALUES = ['nan', 'NaN', '1e5', '-0', ' 12 ', '0x1F', '', 'PASS', '1.5', '.5', '1_000', 'inf', '-Infinity', '1e400', '1+2j', '(3j)']
+
+@pytest.mark.parametrize('value', EDGE_VALUES)
+def test_column_typed_like_single_values(value):
+    expected = avt.convert_csvlog_value(value)
+    # A column of numbers only takes a shortcut, one with text does not
+    for column in ([value], [value, '7'], [value, 'PASS']):
+        typed = avt.convert_csvlog_column(column)
+        assert repr(typed[0]) == repr(expected)
+        assert typed[1:] == [avt.convert_csvlog_value(col) for col in column[1:]]
+
+def test_csvlog_values():
+    assert [avt.convert_csvlog_value(value) for value in EDGE_VALUES] == [
+        'nan', 'NaN', 100000.0, 0, 12, '0x1F', '', 'PASS', 1.5, 0.5, 1000, 'inf', '-Infinity', '1e400', '1+2j', '(3j)']
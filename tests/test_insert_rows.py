@@ -0,0 +1,74 @@
+import openpyxl
+import pytest
+from openpyxl.styles import Font, PatternFill
+
+import avt
+
+# Rows 1-5 hold a title merged over A:C, a header, and three data rows with a value, a formula on
+# their own row and a formula summing the data rows
+@pytest.fixture
+def ws():
+    ws = openpyxl.Workbook().active
+    ws['A1'] = 'Title'
+    ws.merge_cells('A1:C1')
+    ws['A2'] = 'Name'
+    ws['A2'].font = Font(b=True)
+    for row in range(3, 6):
+        ws['A%d' % row] = 'Unit %d' % row
+        ws['B%d' % row] = row
+        ws['B%d' % row].fill = PatternFill('solid', fgColor='FFFF0000')
+        ws['C%d' % row] = '=B%d*$B$3' % row
+    ws['B6'] = '=SUM(B3:B5)'
+    return ws
+
+def values(ws):
+    return {cell.coordinate: cell.value for cell in ws._cells.values() if cell.value is not None}
+
+def test_insert_rows_after_row(ws):
+    avt.insert_rows(ws, 3, 2)
+    assert values(ws) == {
+        'A1': 'Title', 'A2': 'Name',
+        'A3': 'Unit 3', 'B3': 3, 'C3': '=B3*$B$3',
+        # The new rows take the formulas of the row below them, pointing at their own row
+        'C4': '=B4*$B$3', 'C5': '=B5*$B$3',
+        'A6': 'Unit 4', 'B6': 4, 'C6': '=B6*$B$3',
+        'A7': 'Unit 5', 'B7': 5, 'C7': '=B7*$B$3',
+        'B8': '=SUM(B3:B7)',
+    }
+    # ... and its style
+    assert [ws['B%d' % row].fill.fgColor.rgb for row in range(4, 6)] == ['FFFF0000'] * 2
+    assert ws.merged_cell_ranges == ['A1:C1']
+
+def test_insert_rows_above_row(ws):
+    avt.insert_rows(ws, 3, 2, above=True)
+    assert values(ws) == {
+        'A1': 'Title', 'A2': 'Name',
+        'C3': '=B3*$B$5', 'C4': '=B4*$B$5',
+        'A5': 'Unit 3', 'B5': 3, 'C5': '=B5*$B$5',
+        'A6': 'Unit 4', 'B6': 4, 'C6': '=B6*$B$5',
+        'A7': 'Unit 5', 'B7': 5, 'C7': '=B7*$B$5',
+        'B8': '=SUM(B5:B7)',
+    }
+    assert [ws['B%d' % row].fill.fgColor.rgb for row in range(3, 5)] == ['FFFF0000'] * 2
+    assert not ws['A3'].font.b
+
+def test_insert_rows_without_formulas_or_style(ws):
+    avt.insert_rows(ws, 3, 2, fill_formulae=False, copy_style=False)
+    assert ws['C4'].value is None and ws['C5'].value is None
+    assert ws['B4'].fill.fill_type is None
+    assert ws['C6'].value == '=B6*$B$3'
+
+def test_insert_rows_merged_ranges(ws):
+    ws.merge_cells('A4:C4')
+    ws.merge_cells('A2:A5')
+    avt.insert_rows(ws, 4, 2)
+    # Ranges below or over the new rows are shifted or stretched, a single row merge of the row
+    # above is repeated on every new row
+    assert sorted(ws.merged_cell_ranges) == ['A1:C1', 'A2:A7', 'A4:C4', 'A5:C5', 'A6:C6']
+
+def test_insert_rows_moves_row_dimensions(ws):
+    ws.row_dimensions[4].height = 30
+    avt.insert_rows(ws, 3, 2, above=True)
+    assert ws.row_dimensions[6].height == 30
+    # New rows get the height of the highest row
+    assert [ws.row_dimensions[row].height for row in (3, 4)] == [30, 30]
@@ -0,0 +1,42 @@
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import openpyxl
+
+import avt
+from conftest import build
+
+# (shared strings in the table, distinct shared strings the worksheets use)
+def shared_string_usage(path):
+    with zipfile.ZipFile(path) as archive:
+        sst = archive.read('xl/sharedStrings.xml').decode('utf-8')
+        used = set()
+        for name in archive.namelist():
+            if re.match(r'xl/worksheets/sheet\d+\.xml$', name):
+                for cell in ElementTree.fromstring(archive.read(name)).iter('{%s}c' % avt.SHEET_MAIN_NS):
+                    value = cell.find('{%s}v' % avt.SHEET_MAIN_NS)
+                    if cell.get('t') == 's' and value is not None:
+                        used.add(int(value.text))
+    return len(re.findall(r'<si\b', sst)), used
+
+def test_patch_shared_strings_stay_stable(inputs, tmp_path):
+    # A sheet the steps don't edit, copied as it is into every generation
+    workbook = openpyxl.load_workbook(inputs['source'])
+    workbook.create_sheet('Notes')['A1'] = 'note of the template'
+    workbook.get_sheet_by_name('Notes')['A2'] = 'CSV LOG'
+    workbook.save(inputs['source'])
+
+    # The table of a patched generation holds the same strings as the one openpyxl writes for it
+    (tmp_path / 'patch').mkdir()
+    (tmp_path / 'full').mkdir()
+    patched = full = inputs['source']
+    for ver in ['12', '13', '14', '15']:
+        patched = build(inputs, source=patched, ver=ver, output_dir=str(tmp_path / 'patch'), patch_xlsx=True)
+        full = build(inputs, source=full, ver=ver, output_dir=str(tmp_path / 'full'))
+        size, used = shared_string_usage(patched)
+        assert used == set(range(size)) # No string is kept that no sheet uses
+        assert size == shared_string_usage(full)[0]
+
+    notes = openpyxl.load_workbook(patched).get_sheet_by_name('Notes')
+    assert (notes['A1'].value, notes['A2'].value) == ('note of the template', 'CSV LOG')
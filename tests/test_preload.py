@@ -0,0 +1,27 @@
+import os
+import sys
+
+import avt
+from conftest import make_csv, make_modem
+
+# The lines and rows are kept while their memory, not their characters, stays under the limit
+def test_preload_counts_memory(tmp_path, monkeypatch):
+    make_modem(str(tmp_path / 'modem.txt'), rows=1000)
+    make_csv(str(tmp_path / 'raw.csv'), rows=1000)
+    modem = avt.ModemLog(str(tmp_path / 'modem.txt'), True)
+    rows = avt.read_csv_rows(str(tmp_path / 'raw.csv'))
+    assert len(modem.lines) == len(rows) == 1000
+    memory = [sum(map(sys.getsizeof, modem.lines)), sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in rows)]
+
+    sizes = [os.path.getsize(str(tmp_path / name)) for name in ['modem.txt', 'raw.csv']]
+
+    # Limits above the file sizes, below the memory their lines and rows take
+    monkeypatch.setattr(avt, 'preload_max_bytes', memory[0] * 2 // 3)
+    assert sizes[0] < avt.preload_max_bytes
+    modem = avt.ModemLog(str(tmp_path / 'modem.txt'), True)
+    assert modem.lines is None and modem.line_count == 1000 # Read again by rows()
+    assert len(list(modem.rows())) == 1000
+
+    monkeypatch.setattr(avt, 'preload_max_bytes', memory[1] * 2 // 3)
+    assert sizes[1] < avt.preload_max_bytes
+    assert avt.read_csv_rows(str(tmp_path / 'raw.csv')) is None
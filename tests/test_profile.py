@@ -0,0 +1,27 @@
+import json
+import os
+
+import avt
+from conftest import build
+
+def test_profile_report(inputs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert avt.main(['-s', inputs['source'], '-l', inputs['csvlog'], '-m', inputs['modem'], '-c', inputs['csv'],
+                     '-v', '12', '-d', '20170509', '--profile', 'profile.json']) == 0
+    with open('profile.json', encoding='utf_8') as f:
+        report = json.load(f)
+    assert os.path.basename(report['target']) == 'QTVerification_FCT_JH20170509ver12_TPA_005.xlsx'
+
+    stages = {stage['name']: stage for stage in report['stages']}
+    assert list(stages) == ['template load', 'step 0 metadata', 'step 1 version', 'step 2 program verification',
+                            'step 3 csv log comparison', 'step 3b csv log units', 'step 4 uart log check', 'step 5 csv file', 'save']
+    for stage in stages.values():
+        assert stage['wall_time'] >= 0 and stage['cpu_time'] >= 0 and stage['peak_memory'] > 0
+    assert stages['template load']['bytes_read'] >= os.path.getsize(inputs['source']) # With the inputs read ahead meanwhile
+    assert stages['step 5 csv file']['cells_written'] == 20 * 4
+    assert report['totals']['cells_written'] == sum(stage.get('cells_written', 0) for stage in stages.values())
+    assert report['totals']['peak_memory'] == max(stage['peak_memory'] for stage in stages.values())
+
+def test_profile_is_off_by_default(inputs):
+    build(inputs)
+    assert avt.profiler.report()['stages'] == []
@@ -0,0 +1,76 @@
+import contextlib
+import os
+import socket
+import socketserver
+import threading
+
+import pytest
+
+import avt
+
+# A worker like --serve in a thread, stopped when the test is done
+@contextlib.contextmanager
+def running_worker(path, **options):
+    server = socketserver.UnixStreamServer(path, avt.JobHandler)
+    server.options = dict(avt.build_options, **options)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield path
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+@pytest.fixture
+def worker(tmp_path):
+    with running_worker(str(tmp_path / 'avt.sock')) as path:
+        yield path
+
+@pytest.mark.parametrize('job', [[1], "x", 3, None])
+def test_worker_rejects_job_that_is_not_an_object(worker, job):
+    result = avt.submit_job(worker, job)
+    assert result['status'] == 'FAILED'
+    assert 'not a JSON object' in result['error']
+
+def test_worker_rejects_incomplete_job(worker):
+    result = avt.submit_job(worker, {'csvlog': 'log.csv'})
+    assert result == {'status': 'FAILED', 'error': 'Job is missing: source, modem, csv, ver, date'}
+
+def test_worker_builds_job(worker, inputs):
+    job = dict(inputs, ver='12', date='20170509', output_dir=str(inputs['source']).rsplit('/', 1)[0])
+    result = avt.submit_job(worker, job)
+    assert result['status'] == 'OK'
+    assert result['target'].endswith('QTVerification_FCT_JH20170509ver12_TPA_005.xlsx')
+
+def test_submit_job_without_reply(tmp_path):
+    path = str(tmp_path / 'closed.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen(1)
+        # Reads the job and hangs up, as a worker that died on it
+        def hang_up():
+            connection = server.accept()[0]
+            connection.makefile('rb').readline()
+            connection.close()
+        thread = threading.Thread(target=hang_up)
+        thread.start()
+        with pytest.raises(ConnectionError, match="without a result"):
+            avt.submit_job(path, {'csvlog': 'log.csv'})
+        thread.join()
+
+def test_connect_leaves_source_to_the_worker(inputs, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    args = ['-l', inputs['csvlog'], '-m', inputs['modem'], '-c', inputs['csv'], '-d', '20170509']
+
+    # A worker without version history needs the source
+    with running_worker(str(tmp_path / 'plain.sock')) as path:
+        assert avt.main(['--connect', path, '-v', '13'] + args) == 1
+    assert "Job is missing: source" in capsys.readouterr().out
+
+    # A worker with one builds from the latest recorded document of the station
+    history = str(tmp_path / 'history.db')
+    avt.main(['-s', inputs['source'], '-v', '12', '--history', history] + args)
+    with running_worker(str(tmp_path / 'history.sock'), history=history) as path:
+        assert avt.main(['--connect', path, '-v', '13'] + args) == 0
+    assert os.path.isfile(str(tmp_path / 'QTVerification_FCT_JH20170509ver13_TPA_006.xlsx'))
@@ -0,0 +1,30 @@
+import os
+
+import avt
+from conftest import make_template
+
+def test_template_cache_keeps_recently_used_templates(tmp_path):
+    paths = [str(tmp_path / 't{}.xlsx'.format(i)) for i in range(3)]
+    for path in paths:
+        make_template(path)
+    cache = avt.TemplateCache(max_templates=2)
+    for path in paths[:2]:
+        cache.load(path)
+    cache.load(paths[0]) # t1 is now the least recently used
+    cache.load(paths[2])
+    assert [os.path.basename(k[0]) for k in cache.templates] == ['t0.xlsx', 't2.xlsx']
+
+def test_template_cache_drops_changed_template(tmp_path):
+    path = str(tmp_path / 't.xlsx')
+    make_template(path)
+    cache = avt.TemplateCache()
+    cache.load(path)
+    cache.load(path, patch=True)
+    assert len(cache.templates) == 2
+
+    # Both entries of the old file go, the template is parsed again
+    make_template(path, rows=10)
+    os.utime(path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+    workbook = cache.load(path)
+    assert list(cache.templates) == [(path, False)]
+    assert workbook.get_sheet_by_name('CSV log comparison').max_row == 16
@@ -0,0 +1,21 @@
+import numpy
+import pytest
+
+import avt
+
+pytestmark = pytest.mark.skipif(avt.numpy is None, reason="--aggregate needs numpy")
+
+def outliers(*columns, outlier_z=3.5):
+    return avt.csvlog_unit_statistics(numpy.array(columns, dtype=float).T, outlier_z)['outliers'].T.tolist()
+
+def test_outliers_of_spread_values():
+    assert outliers([1.0, 1.1, 0.9, 1.05, 0.95, 5.0]) == [[False] * 5 + [True]]
+
+def test_outliers_when_most_units_tie():
+    # The MAD is 0, a tiny difference of a low-resolution reading is not an outlier
+    assert outliers([1.0, 1.0, 1.0, 1.0001]) == [[False] * 4]
+    # A unit far off the others still is
+    assert outliers([2.0] * 9 + [7.0]) == [[False] * 9 + [True]]
+
+def test_no_outliers_when_all_units_agree():
+    assert outliers([2.0, 2.0, 2.0], [1.0, numpy.nan, 1.0]) == [[False] * 3, [False] * 3]
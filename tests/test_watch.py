@@ -0,0 +1,67 @@
+import os
+import signal
+
+import avt
+from conftest import make_csv, make_csvlog, make_modem, make_template
+
+def test_has_serial_num():
+    assert avt.has_serial_num('/w/MODEM/C02X1.txt', 'C02X1')
+    assert avt.has_serial_num('/w/MODEM/modem_C02X1-2.txt.gz', 'C02X1')
+    assert not avt.has_serial_num('/w/MODEM/C02X12.txt', 'C02X1')
+    assert not avt.has_serial_num('/w/MODEM/XC02X1.txt', 'C02X1')
+
+def test_watch_pairs_files_of_the_same_serial_number(tmp_path):
+    make_template(str(tmp_path / 't.xlsx'))
+    watcher = avt.FolderWatcher(str(tmp_path), str(tmp_path / 't.xlsx'), '12', debounce=0)
+    watcher.started = 0
+    for name in ['CSVLOG', 'MODEM', 'CSV']:
+        (tmp_path / name).mkdir()
+    for serial_num in ['C02X1', 'C02X12']:
+        make_csvlog(str(tmp_path / 'CSVLOG' / '{}.csv'.format(serial_num)), serial_num=serial_num)
+        make_modem(str(tmp_path / 'MODEM' / '{}.txt'.format(serial_num)))
+        make_csv(str(tmp_path / 'CSV' / '{}_raw.csv'.format(serial_num)))
+    # The files of C02X12 are closer in time to the CSVLOG file of C02X1 than its own ones
+    for path, mtime in [('CSVLOG/C02X1.csv', 1000), ('MODEM/C02X1.txt', 500), ('CSV/C02X1_raw.csv', 500),
+                        ('CSVLOG/C02X12.csv', 1000), ('MODEM/C02X12.txt', 1000), ('CSV/C02X12_raw.csv', 1000)]:
+        os.utime(str(tmp_path / path), (mtime, mtime))
+
+    # Both units run on the same station, so they are queued one poll after the other
+    jobs = []
+    for now in range(4):
+        jobs += watcher.ready_jobs(now)
+        watcher.busy.clear()
+    pairs = sorted((job['csvlog'].split('/')[-1], job['modem'].split('/')[-1], job['csv'].split('/')[-1]) for job in jobs)
+    assert pairs == [('C02X1.csv', 'C02X1.txt', 'C02X1_raw.csv'), ('C02X12.csv', 'C02X12.txt', 'C02X12_raw.csv')]
+
+def test_watch_workers_ignore_ctrl_c():
+    with avt.watch_pool(1) as pool:
+        assert pool.submit(signal.getsignal, signal.SIGINT).result() == signal.SIG_IGN
+
+def test_watch_forgets_removed_files(tmp_path):
+    make_template(str(tmp_path / 't.xlsx'))
+    watcher = avt.FolderWatcher(str(tmp_path), str(tmp_path / 't.xlsx'), '12', debounce=0)
+    watcher.started = 0
+    for name in ['CSVLOG', 'MODEM', 'CSV']:
+        (tmp_path / name).mkdir()
+    make_csvlog(str(tmp_path / 'CSVLOG' / 'C02X1.csv'), serial_num='C02X1')
+    make_csvlog(str(tmp_path / 'CSVLOG' / 'C02X2.csv'), serial_num='C02X2', station_name='ICT')
+    make_modem(str(tmp_path / 'MODEM' / 'C02X1.txt'))
+    make_csv(str(tmp_path / 'CSV' / 'C02X1.csv'))
+
+    # C02X1 is queued, C02X2 waits for its MODEM and CSV files
+    assert len(watcher.ready_jobs(0) + watcher.ready_jobs(1)) == 1
+    assert [os.path.basename(path) for path, state in watcher.done] == ['C02X1.csv']
+    assert [os.path.basename(path) for path, state in watcher.headers] == ['C02X2.csv']
+
+    for path in ['CSVLOG/C02X1.csv', 'CSVLOG/C02X2.csv', 'MODEM/C02X1.txt', 'CSV/C02X1.csv']:
+        os.remove(str(tmp_path / path))
+    assert watcher.ready_jobs(2) == []
+    assert (watcher.done, watcher.headers) == (set(), {})
+    assert watcher.seen == {'modem': {}, 'csv': {}, 'csvlog': {}}
+
+def test_serial_files():
+    files = [('/w/MODEM/C02X1.txt', None), ('/w/MODEM/C02X12.txt', None), ('/w/MODEM/unit-C02-X1.txt', None)]
+    index = avt.serial_index(files)
+    assert avt.serial_files(index, 'C02X1') == files[:1]
+    assert avt.serial_files(index, 'C02-X1') == files[2:]
+    assert avt.serial_files(index, 'C02X3') == []